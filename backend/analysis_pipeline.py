@@ -0,0 +1,229 @@
+import asyncio
+import json
+import uuid
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from fastapi import HTTPException
+from database import get_repository
+from stock_service import StockDataService
+from technical_indicators import TechnicalIndicatorsService
+from ml_models import MLPredictionService
+from recommendation_engine import RecommendationEngine
+from executors import run_io, run_compute, run_ml
+from jobs import get_job_queue, predict_in_worker
+from write_behind import persist
+from market_calendar import last_session_date, market_for_ticker
+from instrumentation import timed
+
+stock_service = StockDataService()
+technical_service = TechnicalIndicatorsService()
+ml_service = MLPredictionService()
+recommendation_engine = RecommendationEngine()
+job_queue = get_job_queue()
+
+async def analyze(ticker: str, model_type: str, prediction_days: int, forecast_mode: str = "recursive") -> Dict:
+    # The precompute worker may already have analysed this stock after the last close
+    snapshot = await run_io(get_snapshot, ticker, model_type, prediction_days, forecast_mode)
+    if snapshot:
+        return snapshot
+    return await run_analysis(ticker, model_type, prediction_days, forecast_mode)
+
+async def run_analysis(ticker: str, model_type: str, prediction_days: int, forecast_mode: str = "recursive", in_background: bool = False) -> Dict:
+    stock = await run_io(stock_service.get_or_create_stock, ticker)
+    if not stock:
+        raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
+
+    stock_id = stock["id"]
+
+    # Statements do not depend on prices, fetch them while the pipeline runs
+    financial_task = asyncio.create_task(
+        run_io(stock_service.get_financial_statements, ticker, stock_id=stock_id)
+    )
+    ml_task = None
+
+    try:
+        sync_report = await run_io(stock_service.sync_stock_prices, stock_id, ticker, full_period="2y")
+        if sync_report["mode"] == "full" and sync_report["rows_fetched"] == 0:
+            raise HTTPException(status_code=404, detail=f"No data available for {ticker}")
+
+        prices_df = await run_io(stock_service.get_price_frame, stock_id, ticker, sync_report["records"], days=365)
+        if prices_df.empty:
+            raise HTTPException(status_code=404, detail="No price data available")
+
+        if in_background:
+            # Heavy training goes to the bounded process pool, off the API process
+            ml_task = asyncio.create_task(
+                job_queue.run_in_process(predict_in_worker, prices_df, model_type, prediction_days, ticker, forecast_mode)
+            )
+        else:
+            ml_task = asyncio.create_task(
+                run_ml(
+                    ml_service.predict, prices_df, model_type=model_type,
+                    prediction_days=prediction_days, ticker=ticker, forecast_mode=forecast_mode
+                )
+            )
+
+        indicators_df = await run_compute(technical_service.calculate_indicators, prices_df, stock_id=stock_id)
+
+        return await complete_analysis(
+            stock, prices_df, indicators_df, ml_task, financial_task, model_type, prediction_days
+        )
+    except BaseException:
+        await _cancel_pending(financial_task, ml_task)
+        raise
+
+async def _cancel_pending(*tasks: Optional[asyncio.Task]):
+    # A failed request must not leave its side tasks holding an ML slot or
+    # an I/O thread. Jobs an executor has already started run to completion,
+    # queued ones are dropped
+    tasks = [task for task in tasks if task is not None]
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def complete_analysis(stock: Dict, prices_df: pd.DataFrame, indicators_df: pd.DataFrame, ml_task: asyncio.Task, financial_task: asyncio.Task, model_type: str, prediction_days: int) -> Dict:
+    stock_id = stock["id"]
+
+    if not indicators_df.empty:
+        await run_io(technical_service.save_indicators, stock_id, indicators_df)
+
+    current_price = float(prices_df["close"].iloc[-1])
+    latest_indicators = technical_service.build_indicator_records(stock_id, indicators_df.tail(1)) if not indicators_df.empty else []
+
+    if latest_indicators:
+        latest_ind = latest_indicators[0]
+        latest_ind["close"] = current_price
+        technical_analysis = technical_service.analyze_technical_signals(latest_ind)
+    else:
+        technical_analysis = {"score": 0.5, "signals": [], "sentiment": "neutral"}
+
+    ml_result = await ml_task
+    if not ml_result:
+        raise HTTPException(status_code=500, detail="Prediction failed")
+
+    financial_data = await financial_task
+
+    predicted_price = ml_result["predictions"][-1]["price"] if ml_result["predictions"] else current_price
+
+    recommendation_data = recommendation_engine.generate_recommendation(
+        stock_id=stock_id,
+        current_price=current_price,
+        predicted_price=predicted_price,
+        prediction_confidence=ml_result["confidence_score"],
+        technical_analysis=technical_analysis,
+        financial_data=financial_data
+    )
+
+    saved_recommendation, prediction_run_id = await asyncio.gather(
+        run_io(recommendation_engine.save_recommendation, recommendation_data),
+        run_io(save_predictions, stock_id, model_type, prediction_days, ml_result)
+    )
+
+    prev_price = float(prices_df["close"].iloc[0]) if len(prices_df) > 1 else current_price
+    price_change = current_price - prev_price
+    price_change_pct = (price_change / prev_price) * 100
+
+    response = {
+        "stock": stock,
+        "latest_price": current_price,
+        "price_change": price_change,
+        "price_change_percent": price_change_pct,
+        "historical_prices": stock_service.price_rows(stock_id, prices_df.tail(90)),
+        "technical_indicators": latest_indicators[:30] if latest_indicators else [],
+        "predictions": ml_result["predictions"],
+        "prediction_run_id": prediction_run_id,
+        "recommendation": saved_recommendation,
+        "financial_summary": financial_data.get("info", {})
+    }
+
+    return response
+
+async def analyze_from_history(ticker: str, history: pd.DataFrame, recent: pd.DataFrame, indicators_df: pd.DataFrame, model_type: str, prediction_days: int, forecast_mode: str) -> Dict:
+    stock = await run_io(stock_service.get_or_create_stock, ticker)
+    if not stock:
+        raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
+
+    stock_id = stock["id"]
+
+    financial_task = asyncio.create_task(
+        run_io(stock_service.get_financial_statements, ticker, stock_id=stock_id)
+    )
+
+    ml_task = None
+
+    try:
+        # The bulk download already holds the bars, the sync only writes what is missing
+        sync_report = await run_io(stock_service.sync_stock_prices, stock_id, ticker, full_period="2y", history=history)
+        # Keep the local store level with the database for the next single analysis
+        await run_io(stock_service.update_price_store, stock_id, ticker, sync_report["records"])
+
+        prices_df = pd.DataFrame(stock_service.build_price_records(stock_id, recent))
+
+        ml_task = asyncio.create_task(
+            job_queue.run_in_process(predict_in_worker, prices_df, model_type, prediction_days, ticker, forecast_mode)
+        )
+
+        result = await complete_analysis(
+            stock, prices_df, indicators_df, ml_task, financial_task, model_type, prediction_days
+        )
+    except BaseException:
+        await _cancel_pending(financial_task, ml_task)
+        raise
+
+    result.pop("historical_prices")
+    return result
+
+def recent_history(hist: pd.DataFrame, days: int = 365) -> pd.DataFrame:
+    start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return hist[hist.index.strftime("%Y-%m-%d") >= start_date]
+
+@timed("save_predictions")
+def save_predictions(stock_id: str, model_type: str, prediction_days: int, ml_result: Dict) -> Optional[str]:
+    run_id = str(uuid.uuid4())
+    rows = [
+        {
+            "stock_id": stock_id,
+            "run_id": run_id,
+            "target_date": pred["date"],
+            "predicted_price": pred["price"],
+            "model_type": model_type,
+            "confidence_score": ml_result["confidence_score"],
+            "prediction_horizon": prediction_days,
+            "features_used": {"mae": ml_result["mae"], "rmse": ml_result["rmse"], "forecast_mode": ml_result["forecast_mode"]}
+        }
+        for pred in ml_result["predictions"][:prediction_days]
+    ]
+
+    report = persist("predictions", rows)
+    return run_id if not report["failed"] else None
+
+def save_snapshot(ticker: str, model_type: str, prediction_days: int, forecast_mode: str, result: Dict) -> Dict:
+    record = {
+        "stock_id": result["stock"]["id"],
+        "ticker": ticker.upper(),
+        "model_type": model_type,
+        "prediction_days": prediction_days,
+        "forecast_mode": forecast_mode,
+        "session_date": last_session_date(market_for_ticker(ticker)).isoformat(),
+        "payload": json.loads(json.dumps(result, default=str)),
+        "updated_at": datetime.now().isoformat()
+    }
+
+    return persist("analysis_snapshots", [record], on_conflict="ticker,model_type,prediction_days,forecast_mode")
+
+def get_snapshot(ticker: str, model_type: str, prediction_days: int, forecast_mode: str) -> Optional[Dict]:
+    try:
+        snapshot = get_repository().get_analysis_snapshot(ticker.upper(), model_type, prediction_days, forecast_mode)
+    except Exception as e:
+        print(f"Error reading analysis snapshot for {ticker}: {str(e)}")
+        return None
+
+    if not snapshot:
+        return None
+
+    # Only a snapshot of the latest completed session is current
+    if snapshot["session_date"] != last_session_date(market_for_ticker(ticker)).isoformat():
+        return None
+    return snapshot["payload"]
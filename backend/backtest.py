@@ -0,0 +1,227 @@
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List
+from technical_indicators import TechnicalIndicatorsService
+from ml_models import MLPredictionService
+from recommendation_engine import RecommendationEngine, Thresholds
+
+TRADING_DAYS = 252
+
+# Replays the analysis pipeline over history for many tickers. The
+# expensive part, walk-forward model training, runs once in prepare();
+# evaluate() is pure array work on the result, so threshold sweeps over
+# hundreds of tickers only redo the scoring and the return arithmetic.
+class Backtester:
+    def __init__(
+        self,
+        horizon: int = 30,
+        retrain_every: int = 21,
+        train_window: int = TRADING_DAYS,
+        lookback: int = 60,
+        max_workers: int = 4
+    ):
+        self.horizon = horizon
+        self.retrain_every = retrain_every
+        self.train_window = train_window
+        self.lookback = lookback
+        self.max_workers = max_workers
+        self.technical = TechnicalIndicatorsService()
+        self.ml = MLPredictionService()
+        self.recommendations = RecommendationEngine()
+
+    def prepare(self, price_frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        indicators = self.technical.calculate_indicators_batch(price_frames)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            forecasts = dict(zip(indicators, executor.map(self._walk_forward, indicators.values())))
+
+        frames = []
+        for ticker, df in indicators.items():
+            close = df["close"].to_numpy(dtype=np.float64)
+            predicted, confidence = forecasts[ticker]
+            frames.append(pd.DataFrame({
+                "ticker": ticker,
+                "date": pd.to_datetime(df["date"]),
+                "close": close,
+                "rsi_14": df["rsi_14"].to_numpy(),
+                "macd": df["macd"].to_numpy(),
+                "macd_signal": df["macd_signal"].to_numpy(),
+                "sma_50": df["sma_50"].to_numpy(),
+                "sma_200": df["sma_200"].to_numpy(),
+                "predicted_price": predicted,
+                "prediction_confidence": confidence,
+                "next_return": np.append(close[1:] / close[:-1] - 1, np.nan),
+                "forward_close": np.append(close[self.horizon:], np.full(min(self.horizon, len(close)), np.nan))
+            }))
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def evaluate(self, data: pd.DataFrame, thresholds: Thresholds = Thresholds(), long_only: bool = True, cost_bps: float = 0.0) -> Dict:
+        # Fundamentals have no history, they score neutral (0.5) like a stock without financial data
+        scores = pd.DataFrame({
+            "current_price": data["close"].to_numpy(),
+            "predicted_price": data["predicted_price"].to_numpy(),
+            "prediction_confidence": data["prediction_confidence"].to_numpy(),
+            "technical_score": self.technical.analyze_technical_signals_batch(data)["score"].to_numpy()
+        })
+        action = self.recommendations.generate_recommendations_batch(scores, thresholds)["action"].to_numpy()
+
+        # Buy goes long, sell exits (or shorts), hold keeps whatever is held
+        target = np.select([action == "buy", action == "sell"], [1.0, 0.0 if long_only else -1.0], np.nan)
+        target[np.isnan(data["predicted_price"].to_numpy())] = 0.0
+        position = pd.Series(target).groupby(data["ticker"].to_numpy()).ffill().fillna(0.0).to_numpy()
+
+        previous = pd.Series(position).groupby(data["ticker"].to_numpy()).shift(fill_value=0.0).to_numpy()
+        strategy = position * np.nan_to_num(data["next_return"].to_numpy()) - np.abs(position - previous) * cost_bps / 10000
+
+        signalled = (action != "hold") & ~np.isnan(data["forward_close"].to_numpy())
+        forward = data["forward_close"].to_numpy() - data["close"].to_numpy()
+        hits = np.where(action == "buy", forward > 0, forward < 0)
+
+        # Each ticker is scored from its first forecast on, the benchmark over the same days
+        started = pd.Series(~np.isnan(data["predicted_price"].to_numpy())).groupby(data["ticker"].to_numpy()).cummax().to_numpy()
+
+        per_ticker = pd.DataFrame({
+            "ticker": data["ticker"].to_numpy(),
+            "date": data["date"].to_numpy(),
+            "strategy": strategy,
+            "benchmark": np.nan_to_num(data["next_return"].to_numpy()),
+            "signal": signalled,
+            "hit": signalled & hits,
+            "trade": position != previous
+        })[started]
+
+        tickers = per_ticker.groupby("ticker").agg(
+            signals=("signal", "sum"),
+            hits=("hit", "sum"),
+            trades=("trade", "sum")
+        )
+        tickers["hit_rate"] = tickers["hits"] / tickers["signals"].where(tickers["signals"] > 0)
+        by_ticker = per_ticker["ticker"]
+        for column in ("strategy", "benchmark"):
+            equity = (1 + per_ticker[column]).groupby(by_ticker).cumprod()
+            drawdown = equity / equity.groupby(by_ticker).cummax() - 1
+            tickers[f"{column}_return"] = equity.groupby(by_ticker).last() - 1
+            tickers[f"{column}_max_drawdown"] = drawdown.groupby(by_ticker).min()
+
+        # Equal weight across whichever tickers traded that day
+        portfolio = per_ticker.groupby("date")[["strategy", "benchmark"]].mean()
+        signals = int(tickers["signals"].sum())
+
+        return {
+            "thresholds": thresholds,
+            "hit_rate": float(tickers["hits"].sum() / signals) if signals else None,
+            "signals": signals,
+            "trades": int(tickers["trades"].sum()),
+            "actions": {name: int((action == name).sum()) for name in ("buy", "hold", "sell")},
+            "portfolio": {column: _performance(portfolio[column].to_numpy()) for column in ("strategy", "benchmark")},
+            "tickers": tickers
+        }
+
+    def sweep(self, data: pd.DataFrame, grid: Dict[str, List[float]], **kwargs) -> pd.DataFrame:
+        names = list(grid)
+        rows = []
+        for values in itertools.product(*(grid[name] for name in names)):
+            thresholds = replace(Thresholds(), **dict(zip(names, values)))
+            report = self.evaluate(data, thresholds, **kwargs)
+            rows.append({
+                **dict(zip(names, values)),
+                "hit_rate": report["hit_rate"],
+                "signals": report["signals"],
+                "trades": report["trades"],
+                **{f"strategy_{k}": v for k, v in report["portfolio"]["strategy"].items()}
+            })
+
+        return pd.DataFrame(rows).sort_values("strategy_total_return", ascending=False, ignore_index=True)
+
+    def _walk_forward(self, df: pd.DataFrame):
+        close = df["close"].to_numpy(dtype=np.float64)
+        predicted = np.full(len(close), np.nan)
+        confidence = np.full(len(close), np.nan)
+
+        for start in range(self.train_window, len(close), self.retrain_every):
+            end = min(start + self.retrain_every, len(close))
+
+            # Only bars before the segment are used, targets included
+            train = df.iloc[start - self.train_window:start]
+            X, y, scaler = self.ml.prepare_data(train, lookback=self.lookback, dtype=np.float32, horizon=self.horizon)
+            if len(X) < 100:
+                continue
+
+            y = y[:, -1] if y.ndim > 1 else y
+            model, metrics = self.ml._train_xgboost(X, y)
+
+            # One window per segment day, ending at that day's close
+            scaled = scaler.transform(close[start - self.lookback + 1:end].reshape(-1, 1))[:, 0].astype(np.float32)
+            windows = sliding_window_view(scaled, self.lookback)
+            forecast = model.predict(windows)
+
+            predicted[start:end] = scaler.inverse_transform(forecast.reshape(-1, 1))[:, 0]
+            confidence[start:end] = metrics["confidence"]
+
+        return predicted, confidence
+
+def _max_drawdown(returns: np.ndarray) -> float:
+    equity = np.cumprod(1 + returns)
+    return float((equity / np.maximum.accumulate(equity) - 1).min()) if len(equity) else 0.0
+
+def _performance(returns: np.ndarray) -> Dict[str, float]:
+    returns = np.nan_to_num(returns)
+    total = float(np.prod(1 + returns) - 1)
+    years = len(returns) / TRADING_DAYS
+    volatility = float(returns.std() * np.sqrt(TRADING_DAYS))
+    return {
+        "total_return": total,
+        "annualized_return": float((1 + total) ** (1 / years) - 1) if years else 0.0,
+        "volatility": volatility,
+        "sharpe": float(returns.mean() * TRADING_DAYS / volatility) if volatility else 0.0,
+        "max_drawdown": _max_drawdown(returns)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the recommendation rules")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--period", default="5y", help="History to download")
+    parser.add_argument("--horizon", type=int, default=30, help="Prediction horizon in trading days")
+    parser.add_argument("--retrain-every", type=int, default=21, help="Trading days between model refits")
+    parser.add_argument("--train-window", type=int, default=TRADING_DAYS, help="Trading days each model is trained on")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--allow-short", action="store_true", help="Sell signals go short instead of flat")
+    parser.add_argument("--cost-bps", type=float, default=0.0, help="Cost per unit of position change, in basis points")
+    parser.add_argument("--sweep", action="store_true", help="Also sweep the price move and score thresholds")
+    args = parser.parse_args()
+
+    from stock_service import StockDataService
+    histories = StockDataService().fetch_price_histories([t.upper() for t in args.tickers], period=args.period)
+    price_frames = {
+        ticker: pd.DataFrame({"date": hist.index.tz_localize(None), "close": hist["Close"].astype(float).to_numpy()})
+        for ticker, hist in histories.items()
+    }
+
+    backtester = Backtester(args.horizon, args.retrain_every, args.train_window, max_workers=args.workers)
+    data = backtester.prepare(price_frames)
+    options = {"long_only": not args.allow_short, "cost_bps": args.cost_bps}
+
+    report = backtester.evaluate(data, **options)
+    print(report["tickers"].to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"\nHit rate: {report['hit_rate']}, signals: {report['signals']}, trades: {report['trades']}, actions: {report['actions']}")
+    for name, performance in report["portfolio"].items():
+        print(f"{name}: " + ", ".join(f"{k} {v:.3f}" for k, v in performance.items()))
+
+    if args.sweep:
+        defaults = Thresholds()
+        grid = {
+            name: [getattr(defaults, name) * scale for scale in (0.5, 1.0, 1.5)]
+            for name in ("strong_move_pct", "move_pct")
+        }
+        grid["buy_score"] = [0.55, 0.6, 0.65]
+        grid["sell_score"] = [0.35, 0.4, 0.45]
+        print(backtester.sweep(data, grid, **options).head(20).to_string(float_format=lambda v: f"{v:.3f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import json
+import re
+import threading
+import uuid
+import pandas as pd
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from benchmarks.synthetic import DEFAULT_BARS, synthetic_ohlcv
+
+STATEMENT_ITEMS = ["Total Revenue", "Net Income", "Total Assets", "Total Debt", "Operating Cash Flow"]
+
+class CallCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+yfinance_calls = CallCounter()
+
+def _period_start(period: str, end: pd.Timestamp) -> Optional[pd.Timestamp]:
+    if period == "max":
+        return None
+    if period.endswith("mo"):
+        return end - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return end - pd.DateOffset(years=int(period[:-1]))
+    return end - pd.Timedelta(days=int(period[:-1]))
+
+class FakeTicker:
+    # Stands in for yfinance.Ticker with deterministic data per symbol
+    bars = DEFAULT_BARS
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker.upper()
+
+    def history(self, period: Optional[str] = None, start: Optional[str] = None, **kwargs) -> pd.DataFrame:
+        yfinance_calls.add()
+        hist = synthetic_ohlcv(self.ticker, bars=self.bars)
+        if start:
+            return hist[hist.index.date >= pd.Timestamp(start).date()]
+
+        first = _period_start(period or "1mo", pd.Timestamp.now().normalize())
+        return hist if first is None else hist[hist.index.date >= first.date()]
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        yfinance_calls.add()
+        return {
+            "longName": f"{self.ticker} Synthetic Corp",
+            "exchange": "JKT" if self.ticker.endswith(".JK") else "NMS",
+            "sector": "Technology",
+            "currency": "IDR" if self.ticker.endswith(".JK") else "USD",
+            "trailingPE": 18.5,
+            "marketCap": 25_000_000_000
+        }
+
+    @property
+    def income_stmt(self) -> pd.DataFrame:
+        return self._statement(1.0)
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        return self._statement(4.0)
+
+    @property
+    def cashflow(self) -> pd.DataFrame:
+        return self._statement(0.6)
+
+    def _statement(self, scale: float) -> pd.DataFrame:
+        yfinance_calls.add()
+        periods = pd.date_range(end=pd.Timestamp.now().normalize(), periods=4, freq="YE")[::-1]
+        return pd.DataFrame(
+            {period: [scale * 1e9 * (i + 1) for i in range(len(STATEMENT_ITEMS))] for period in periods},
+            index=STATEMENT_ITEMS
+        )
+
+def fake_download(tickers, period: str = "1mo", group_by: str = "column", **kwargs) -> pd.DataFrame:
+    if isinstance(tickers, str):
+        tickers = tickers.split()
+
+    # yf.download returns one frame with (ticker, field) columns and no timezone
+    yfinance_calls.add()
+    frames = {}
+    for ticker in tickers:
+        hist = synthetic_ohlcv(ticker, bars=FakeTicker.bars)
+        first = _period_start(period, pd.Timestamp.now().normalize())
+        if first is not None:
+            hist = hist[hist.index.date >= first.date()]
+        hist.index = hist.index.tz_localize(None)
+        frames[ticker.upper()] = hist
+
+    return pd.concat(frames, axis=1)
+
+class _Result:
+    def __init__(self, data: List[Dict]):
+        self.data = data
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self.client = client
+        self.table = table
+        self.columns = "*"
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.bounds: Tuple[int, Optional[int]] = (0, None)
+        self.write: Optional[Tuple[str, List[Dict], Optional[str]]] = None
+
+    def select(self, columns: str = "*") -> "FakeQuery":
+        self.columns = columns
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append((column, "eq", value))
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append((column, "gte", value))
+        return self
+
+    def ilike(self, column: str, pattern: str) -> "FakeQuery":
+        regex = re.compile("^" + re.escape(pattern).replace("%", ".*") + "$", re.IGNORECASE)
+        self.filters.append((column, "ilike", regex))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.bounds = (self.bounds[0], self.bounds[0] + count)
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.bounds = (start, end + 1)
+        return self
+
+    def insert(self, records: List[Dict]) -> "FakeQuery":
+        self.write = ("insert", records, None)
+        return self
+
+    def upsert(self, records: List[Dict], on_conflict: Optional[str] = None) -> "FakeQuery":
+        self.write = ("upsert", records, on_conflict)
+        return self
+
+    def execute(self) -> _Result:
+        return self.client.execute(self)
+
+class FakeSupabaseClient:
+    # In-memory tables behind the supabase-py query builder. Every execute()
+    # is one round trip; payloads go through JSON like the real HTTP calls.
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = defaultdict(list)
+        self._indexes: Dict[Tuple[str, str], Dict[Tuple, Dict]] = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.rows_read = 0
+        self.rows_written = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+            self.rows_read = 0
+            self.rows_written = 0
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"round_trips": self.round_trips, "rows_read": self.rows_read, "rows_written": self.rows_written}
+
+    def execute(self, query: FakeQuery) -> _Result:
+        with self._lock:
+            self.round_trips += 1
+            if query.write:
+                action, records, on_conflict = query.write
+                records = json.loads(json.dumps(records))
+                self.rows_written += len(records)
+                return _Result(self._write(query.table, action, records, on_conflict))
+
+            rows = self._select(query)
+            self.rows_read += len(rows)
+            return _Result(json.loads(json.dumps(rows)))
+
+    def _write(self, table: str, action: str, records: List[Dict], on_conflict: Optional[str]) -> List[Dict]:
+        written = []
+        now = datetime.now(timezone.utc).isoformat()
+        index = self._index(table, on_conflict) if action == "upsert" and on_conflict else None
+        keys = on_conflict.split(",") if index is not None else []
+
+        for record in records:
+            if index is not None:
+                existing = index.get(tuple(record.get(k) for k in keys))
+                if existing is not None:
+                    existing.update(record)
+                    written.append(existing)
+                    continue
+
+            row = {"id": str(uuid.uuid4()), "created_at": now, **record}
+            self.tables[table].append(row)
+            for (indexed_table, conflict), rows in self._indexes.items():
+                if indexed_table == table:
+                    rows[tuple(row.get(k) for k in conflict.split(","))] = row
+            written.append(row)
+
+        return [dict(row) for row in written]
+
+    def _index(self, table: str, on_conflict: str) -> Dict[Tuple, Dict]:
+        index = self._indexes.get((table, on_conflict))
+        if index is None:
+            keys = on_conflict.split(",")
+            index = {tuple(row.get(k) for k in keys): row for row in self.tables[table]}
+            self._indexes[(table, on_conflict)] = index
+        return index
+
+    def _select(self, query: FakeQuery) -> List[Dict]:
+        rows = [row for row in self.tables[query.table] if all(_matches(row, f) for f in query.filters)]
+
+        for column, desc in reversed(query.orders):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+
+        start, end = query.bounds
+        return [self._project(row, query.columns) for row in rows[start:end]]
+
+    def _project(self, row: Dict, columns: str) -> Dict:
+        if columns.strip() == "*":
+            return dict(row)
+
+        projected = {}
+        for name, nested in re.findall(r"(\w+)(?:\(([^)]*)\))?", columns):
+            if nested:
+                # Embedded resource through its foreign key, e.g. stocks(ticker, country)
+                foreign_key = row.get(f"{name.rstrip('s')}_id")
+                related = next((r for r in self.tables[name] if r["id"] == foreign_key), None)
+                projected[name] = self._project(related, nested) if related else None
+            else:
+                projected[name] = row.get(name)
+        return projected
+
+def _matches(row: Dict, condition: Tuple[str, str, Any]) -> bool:
+    column, operator, value = condition
+    current = row.get(column)
+    if operator == "eq":
+        return current == value
+    if operator == "gte":
+        return current is not None and current >= value
+    return current is not None and bool(value.match(str(current)))
+
+def install_fakes() -> FakeSupabaseClient:
+    # Must run before the backend modules are imported: database creates its
+    # client at import time and market_data_cache calls yf.Ticker/yf.download
+    import supabase
+    import yfinance as yf
+
+    client = FakeSupabaseClient()
+    supabase.create_client = lambda url, key: client
+    yf.Ticker = FakeTicker
+    yf.download = fake_download
+    return client
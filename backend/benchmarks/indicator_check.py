@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from datetime import date
+from typing import Dict, List
+from indicator_engine import IndicatorEngine, INDICATOR_COLUMNS
+from benchmarks.synthetic import synthetic_ohlcv
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "indicator_reference.json")
+# A full series and two that start trading later, one of them after
+# INCREMENTAL_START, so the batch paths see leading NaNs
+REFERENCE_SERIES = {"REF0": 260, "REF1": 220, "REF2": 90}
+REFERENCE_END = date(2024, 12, 31)
+# Bars of the batch array computed in one go before the rest are fed
+# through update(). Single series are split in the middle
+INCREMENTAL_START = 120
+
+def reference_closes() -> Dict[str, List[float]]:
+    return {
+        ticker: synthetic_ohlcv(ticker, bars=bars, end=REFERENCE_END)["Close"].tolist()
+        for ticker, bars in REFERENCE_SERIES.items()
+    }
+
+def regenerate(path: str):
+    # ta was the implementation IndicatorEngine replaced, it is only needed here
+    try:
+        import pandas as pd
+        from ta.momentum import RSIIndicator
+        from ta.trend import MACD, SMAIndicator, EMAIndicator
+    except ImportError:
+        print("Regenerating the reference values needs the ta package: pip install ta")
+        sys.exit(1)
+
+    series = {}
+    for ticker, closes in reference_closes().items():
+        close = pd.Series(closes)
+        macd = MACD(close=close, window_slow=26, window_fast=12, window_sign=9)
+        values = {
+            "close": close,
+            "rsi_14": RSIIndicator(close=close, window=14).rsi(),
+            "macd": macd.macd(),
+            "macd_signal": macd.macd_signal(),
+            "macd_histogram": macd.macd_diff(),
+            "sma_20": SMAIndicator(close=close, window=20).sma_indicator(),
+            "sma_50": SMAIndicator(close=close, window=50).sma_indicator(),
+            "sma_200": SMAIndicator(close=close, window=200).sma_indicator(),
+            "ema_12": EMAIndicator(close=close, window=12).ema_indicator(),
+            "ema_26": EMAIndicator(close=close, window=26).ema_indicator(),
+        }
+        series[ticker] = {name: [None if np.isnan(v) else v for v in column.tolist()] for name, column in values.items()}
+
+    with open(path, "w") as f:
+        json.dump({"source": "ta", "end": REFERENCE_END.isoformat(), "series": series}, f)
+    print(f"Wrote {path}")
+
+def load_reference(path: str) -> Dict[str, Dict[str, np.ndarray]]:
+    with open(path) as f:
+        series = json.load(f)["series"]
+    return {
+        ticker: {name: np.array([np.nan if v is None else v for v in values]) for name, values in columns.items()}
+        for ticker, columns in series.items()
+    }
+
+def stacked(reference: Dict[str, Dict[str, np.ndarray]], name: str) -> np.ndarray:
+    # Series aligned on their last bar, shorter ones padded with leading NaNs
+    length = max(len(columns[name]) for columns in reference.values())
+    return np.column_stack([
+        np.concatenate([np.full(length - len(columns[name]), np.nan), columns[name]])
+        for columns in reference.values()
+    ])
+
+def compare(label: str, actual: np.ndarray, expected: np.ndarray, tolerance: float) -> List[str]:
+    if actual.shape != expected.shape:
+        return [f"{label}: shape {actual.shape} != {expected.shape}"]
+    if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+        return [f"{label}: missing values differ"]
+    if not np.allclose(actual, expected, rtol=tolerance, atol=tolerance, equal_nan=True):
+        error = np.nanmax(np.abs(actual - expected))
+        return [f"{label}: max abs error {error:g}"]
+    return []
+
+def check(reference: Dict[str, Dict[str, np.ndarray]], tolerance: float) -> List[str]:
+    engine = IndicatorEngine()
+    failures = []
+
+    for ticker, columns in reference.items():
+        indicators, _ = engine.compute(columns["close"])
+        for name in INDICATOR_COLUMNS:
+            failures += compare(f"compute {ticker} {name}", indicators[name], columns[name], tolerance)
+
+        # The same values built up bar by bar from an early state
+        split = len(columns["close"]) // 2
+        _, state = engine.compute(columns["close"][:split])
+        updates = [engine.update(state, close) for close in columns["close"][split:]]
+        for name in INDICATOR_COLUMNS:
+            incremental = np.concatenate([values[name] for values in updates])
+            failures += compare(f"update {ticker} {name}", incremental, columns[name][split:], tolerance)
+
+    # All series at once as a (time, ticker) array
+    close = stacked(reference, "close")
+    indicators, _ = engine.compute(close)
+    _, state = engine.compute(close[:INCREMENTAL_START])
+    updates = [engine.update(state, row) for row in close[INCREMENTAL_START:]]
+    for name in INDICATOR_COLUMNS:
+        expected = stacked(reference, name)
+        failures += compare(f"compute batch {name}", indicators[name], expected, tolerance)
+        incremental = np.vstack([values[name] for values in updates])
+        failures += compare(f"update batch {name}", incremental, expected[INCREMENTAL_START:], tolerance)
+
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Check IndicatorEngine against stored reference values from the ta library")
+    parser.add_argument("--reference", default=REFERENCE_PATH, help="Reference values file")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Allowed absolute and relative difference")
+    parser.add_argument("--regenerate", action="store_true", help="Recompute the reference values with ta and overwrite the file")
+    args = parser.parse_args()
+
+    if args.regenerate:
+        regenerate(args.reference)
+        return
+
+    failures = check(load_reference(args.reference), args.tolerance)
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"IndicatorEngine matches the reference within {args.tolerance:g}")
+
+if __name__ == "__main__":
+    main()
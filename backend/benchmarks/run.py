@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+def configure(workdir: str, flush_interval: float):
+    # Every cache and store goes to a fresh directory so runs start from the same state
+    os.environ.update({
+        "WRITE_FLUSH_INTERVAL": str(flush_interval),
+        "SUPABASE_URL": "http://benchmark.invalid",
+        "SUPABASE_KEY": "benchmark",
+        "STORAGE_BACKEND": "supabase",
+        "MODEL_REGISTRY_DIR": os.path.join(workdir, "models"),
+        "MARKET_DATA_CACHE_DIR": os.path.join(workdir, "market_data"),
+        "PRICE_STORE_DIR": os.path.join(workdir, "prices"),
+        "SERVER_TIMING_ENABLED": "false",
+    })
+
+class Scenario:
+    def __init__(self, name: str, run: Callable[[int], None], items: int = 1, settle: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.run = run
+        self.items = items
+        self.settle = settle
+
+class Harness:
+    def __init__(self, client, iterations: int, warmup: int):
+        from benchmarks.fakes import yfinance_calls
+        self.client = client
+        self.yfinance_calls = yfinance_calls
+        self.iterations = iterations
+        self.warmup = warmup
+        self.step = 0
+
+    def call(self, scenario: Scenario) -> float:
+        started = time.perf_counter()
+        scenario.run(self.step)
+        elapsed = time.perf_counter() - started
+        self.step += 1
+        if scenario.settle:
+            scenario.settle()
+        return elapsed
+
+    def measure(self, scenario: Scenario, iterations: Optional[int] = None) -> Dict:
+        iterations = iterations or self.iterations
+        for _ in range(self.warmup):
+            self.call(scenario)
+
+        self.client.reset_counters()
+        self.yfinance_calls.reset()
+        latencies = [self.call(scenario) for _ in range(iterations)]
+        counters = self.client.counters()
+        yfinance_calls = self.yfinance_calls.count
+
+        # Allocation tracing slows everything down, so it gets its own pass
+        tracemalloc.start()
+        self.call(scenario)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies_ms = np.array(latencies) * 1000
+        return {
+            "scenario": scenario.name,
+            "iterations": iterations,
+            "items_per_op": scenario.items,
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p95_ms": float(np.percentile(latencies_ms, 95)),
+            "p99_ms": float(np.percentile(latencies_ms, 99)),
+            "mean_ms": float(latencies_ms.mean()),
+            "throughput_per_s": scenario.items * iterations / sum(latencies),
+            "peak_memory_mb": peak / 1024 / 1024,
+            "round_trips_per_op": counters["round_trips"] / iterations,
+            "rows_written_per_op": counters["rows_written"] / iterations,
+            "yfinance_calls_per_op": yfinance_calls / iterations,
+        }
+
+def build_scenarios(args) -> List[Scenario]:
+    from fastapi.testclient import TestClient
+    from benchmarks.synthetic import synthetic_ohlcv, synthetic_tickers, price_frame
+    from benchmarks.fakes import FakeTicker
+    import main
+    from analysis_pipeline import stock_service, technical_service, ml_service
+    from ml_models import TENSORFLOW_AVAILABLE
+
+    FakeTicker.bars = args.bars
+    http = TestClient(main.app)
+    flush = main.write_queue.flush
+    prices = price_frame(synthetic_ohlcv("BENCH", bars=args.bars))
+    recent = prices.tail(252).reset_index(drop=True)
+    analyze_body = {"prediction_days": args.prediction_days, "model_type": "xgboost"}
+
+    def post(path: str, body: Dict):
+        response = http.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def analyze_cold(step: int):
+        post("/api/analyze", {**analyze_body, "ticker": f"SYN{step:04d}"})
+
+    def analyze_cached(step: int):
+        post("/api/analyze", {**analyze_body, "ticker": "CACHED"})
+
+    def analyze_batch(step: int):
+        body = {**analyze_body, "tickers": synthetic_tickers(args.tickers, prefix=f"B{step:03d}X")}
+        # Drain the stream, the last line arrives when every ticker is done
+        for _ in post("/api/analyze/batch", body).iter_lines():
+            pass
+
+    frames = {ticker: price_frame(synthetic_ohlcv(ticker, bars=252)) for ticker in synthetic_tickers(args.tickers)}
+    indicators_df = technical_service.calculate_indicators(recent)
+
+    def persist(step: int):
+        stock_id = f"bench-{step}"
+        history = synthetic_ohlcv("PERSIST", bars=args.bars)
+        stock_service.save_price_records(stock_service.build_price_records(stock_id, history))
+        technical_service.save_indicators(stock_id, indicators_df)
+        flush()
+
+    scenarios = [
+        Scenario("prepare_data", lambda step: ml_service.prepare_data(prices, lookback=60)),
+        Scenario("xgboost_fit", lambda step: ml_service.predict_with_xgboost(prices, args.prediction_days)),
+        Scenario("xgboost_predict", lambda step: ml_service.predict_with_xgboost(prices, args.prediction_days, ticker="BENCH")),
+    ]
+    if TENSORFLOW_AVAILABLE:
+        scenarios += [
+            Scenario("lstm_fit", lambda step: ml_service.predict_with_lstm(prices, args.prediction_days)),
+            Scenario("lstm_predict", lambda step: ml_service.predict_with_lstm(prices, args.prediction_days, ticker="BENCH")),
+        ]
+    scenarios += [
+        Scenario("indicators", lambda step: technical_service.calculate_indicators(recent)),
+        Scenario("indicators_batch", lambda step: technical_service.calculate_indicators_batch(frames), items=args.tickers),
+        Scenario("persist_prices_and_indicators", persist, items=args.bars + len(indicators_df)),
+        Scenario("analyze_cold", analyze_cold, settle=flush),
+        Scenario("analyze_cached", analyze_cached, settle=flush),
+        Scenario("analyze_batch", analyze_batch, items=args.tickers, settle=flush),
+    ]
+    return scenarios
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p50 {before['p50_ms']:.1f}ms -> {result['p50_ms']:.1f}ms")
+        # The fakes are deterministic, so any extra round trip is a real change
+        for key in ("round_trips_per_op", "yfinance_calls_per_op"):
+            if result[key] > before[key]:
+                regressions.append(f"{result['scenario']}: {key} {before[key]:g} -> {result[key]:g}")
+    return regressions
+
+def print_results(results: List[Dict]):
+    print(f"{'scenario':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'peak MB':>10}{'db rt':>8}{'yf':>6}")
+    for r in results:
+        print(
+            f"{r['scenario']:<32}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['throughput_per_s']:>10.1f}{r['peak_memory_mb']:>10.1f}"
+            f"{r['round_trips_per_op']:>8.1f}{r['yfinance_calls_per_op']:>6.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks against synthetic market data and in-memory storage")
+    parser.add_argument("--iterations", type=int, default=10, help="Measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured runs before each scenario")
+    parser.add_argument("--bars", type=int, default=750, help="Daily bars per synthetic ticker")
+    parser.add_argument("--tickers", type=int, default=20, help="Tickers in the batch scenarios")
+    parser.add_argument("--prediction-days", type=int, default=30)
+    parser.add_argument("--flush-interval", type=float, default=0.01, help="Write-behind batching delay, so persistence timings measure the writes rather than the wait")
+    parser.add_argument("--only", nargs="+", help="Only run these scenarios")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    configure(tempfile.mkdtemp(prefix="stock-benchmarks-"), args.flush_interval)
+
+    from benchmarks.fakes import install_fakes
+    client = install_fakes()
+
+    harness = Harness(client, args.iterations, args.warmup)
+    results = []
+    try:
+        for scenario in build_scenarios(args):
+            if args.only and scenario.name not in args.only:
+                continue
+            results.append(harness.measure(scenario))
+            print(f"  {scenario.name} done", file=sys.stderr)
+    finally:
+        from analysis_pipeline import job_queue
+        from executors import shutdown_executors
+        from write_behind import get_write_queue
+        job_queue.shutdown()
+        shutdown_executors()
+        get_write_queue().shutdown()
+
+    print_results(results)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
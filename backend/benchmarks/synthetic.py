@@ -0,0 +1,58 @@
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import List, Optional
+
+DEFAULT_BARS = 750
+MARKET_TIMEZONES = {"US": "America/New_York", "ID": "Asia/Jakarta"}
+
+def synthetic_tickers(count: int, prefix: str = "SYN") -> List[str]:
+    return [f"{prefix}{i:04d}" for i in range(count)]
+
+def ticker_seed(ticker: str) -> int:
+    # hash() is salted per process, crc32 keeps series identical between runs
+    return zlib.crc32(ticker.upper().encode())
+
+def synthetic_ohlcv(
+    ticker: str,
+    bars: int = DEFAULT_BARS,
+    end: Optional[date] = None,
+    start_price: float = 100.0,
+    drift: float = 0.08,
+    volatility: float = 0.25,
+    seed: Optional[int] = None
+) -> pd.DataFrame:
+    rng = np.random.default_rng(ticker_seed(ticker) if seed is None else seed)
+    dt = 1 / 252
+
+    # Geometric Brownian motion for closes, intraday range and gaps around it
+    returns = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal(bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[start_price], close[:-1]]) * (1 + rng.normal(0, 0.002, bars))
+    spread = np.abs(rng.normal(0, volatility * np.sqrt(dt) / 2, bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(mean=14, sigma=0.4, size=bars).astype(np.int64)
+
+    timezone = MARKET_TIMEZONES["ID" if ticker.upper().endswith(".JK") else "US"]
+    end = pd.Timestamp(end or date.today())
+    index = pd.bdate_range(end=end, periods=bars).tz_localize(timezone)
+    index.name = "Date"
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index
+    )
+
+def price_frame(history: pd.DataFrame) -> pd.DataFrame:
+    # Same columns the pipeline reads back from the price store
+    return pd.DataFrame({
+        "date": history.index.tz_localize(None).astype("datetime64[s]"),
+        "open": history["Open"].to_numpy(),
+        "high": history["High"].to_numpy(),
+        "low": history["Low"].to_numpy(),
+        "close": history["Close"].to_numpy(),
+        "volume": history["Volume"].to_numpy(),
+        "adjusted_close": history["Close"].to_numpy()
+    })
@@ -7,6 +7,20 @@ class Settings:
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
 
+    # "supabase", or "sqlite" for the embedded single-node database
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "supabase").lower()
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", ".cache/stock_prediction.db")
+
+    UPSERT_CHUNK_SIZE: int = int(os.getenv("UPSERT_CHUNK_SIZE", "500"))
+
+    MARKET_DATA_CACHE_DIR: str = os.getenv("MARKET_DATA_CACHE_DIR", ".cache/market_data")
+    HISTORY_CACHE_TTL: int = int(os.getenv("HISTORY_CACHE_TTL", "900"))
+    INFO_CACHE_TTL: int = int(os.getenv("INFO_CACHE_TTL", "21600"))
+    STATEMENTS_CACHE_TTL: int = int(os.getenv("STATEMENTS_CACHE_TTL", "86400"))
+    STATEMENT_PERIOD_MONTHS: int = int(os.getenv("STATEMENT_PERIOD_MONTHS", "12"))
+    STATEMENT_FILING_LAG_DAYS: int = int(os.getenv("STATEMENT_FILING_LAG_DAYS", "90"))
+    PRICE_STORE_DIR: str = os.getenv("PRICE_STORE_DIR", ".cache/prices")
+
     API_TITLE: str = "Stock Prediction & Investment API"
     API_VERSION: str = "1.0.0"
     API_DESCRIPTION: str = """
@@ -20,6 +34,47 @@ class Settings:
     - Financial statements analysis
     """
 
+    MODEL_REGISTRY_DIR: str = os.getenv("MODEL_REGISTRY_DIR", ".cache/models")
+    MODEL_CACHE_MEMORY_MB: int = int(os.getenv("MODEL_CACHE_MEMORY_MB", "512"))
+    INDICATOR_STATE_MAX_ENTRIES: int = int(os.getenv("INDICATOR_STATE_MAX_ENTRIES", "2048"))
+
+    IO_POOL_SIZE: int = int(os.getenv("IO_POOL_SIZE", "16"))
+    COMPUTE_POOL_SIZE: int = int(os.getenv("COMPUTE_POOL_SIZE", "4"))
+    ML_POOL_SIZE: int = int(os.getenv("ML_POOL_SIZE", "1"))
+
+    # Imported in the background at startup instead of on the first request
+    ML_WARMUP_BACKENDS: list = [b for b in os.getenv("ML_WARMUP_BACKENDS", "").split(",") if b]
+    # Stored models for these tickers are loaded into memory at startup
+    ML_WARMUP_TICKERS: list = [t.upper() for t in os.getenv("ML_WARMUP_TICKERS", "").split(",") if t]
+
+    TRAINING_MAX_WORKERS: int = int(os.getenv("TRAINING_MAX_WORKERS", "2"))
+    JOB_HISTORY_SIZE: int = int(os.getenv("JOB_HISTORY_SIZE", "1000"))
+
+    WRITE_BEHIND_ENABLED: bool = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+    WRITE_QUEUE_MAX_SIZE: int = int(os.getenv("WRITE_QUEUE_MAX_SIZE", "10000"))
+    WRITE_QUEUE_PUT_TIMEOUT: float = float(os.getenv("WRITE_QUEUE_PUT_TIMEOUT", "1.0"))
+    WRITE_FLUSH_INTERVAL: float = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5"))
+    WRITE_MAX_BATCH_ITEMS: int = int(os.getenv("WRITE_MAX_BATCH_ITEMS", "500"))
+    WRITE_MAX_RETRIES: int = int(os.getenv("WRITE_MAX_RETRIES", "5"))
+    WRITE_RETRY_BACKOFF: float = float(os.getenv("WRITE_RETRY_BACKOFF", "0.5"))
+
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "21600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+    SEARCH_INDEX_REFRESH_SECONDS: int = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "900"))
+    SCREENER_REFRESH_SECONDS: int = int(os.getenv("SCREENER_REFRESH_SECONDS", "300"))
+    SCREENER_RETRY_SECONDS: int = int(os.getenv("SCREENER_RETRY_SECONDS", "30"))
+
+    PRECOMPUTE_CONCURRENCY: int = int(os.getenv("PRECOMPUTE_CONCURRENCY", "4"))
+    PRECOMPUTE_DELAY_MINUTES: int = int(os.getenv("PRECOMPUTE_DELAY_MINUTES", "30"))
+    PRECOMPUTE_MODEL_TYPES: list = os.getenv("PRECOMPUTE_MODEL_TYPES", "xgboost").split(",")
+    PRECOMPUTE_PREDICTION_DAYS: list = [int(days) for days in os.getenv("PRECOMPUTE_PREDICTION_DAYS", "30").split(",")]
+    PRECOMPUTE_FORECAST_MODE: str = os.getenv("PRECOMPUTE_FORECAST_MODE", "recursive")
+
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
     CORS_ORIGINS: list = [
         "http://localhost:5173",
         "http://localhost:3000",
@@ -1,7 +1,56 @@
+import threading
 from supabase import create_client, Client
 from config import settings
+from typing import Dict, List, Optional
+from repository import StorageRepository, SupabaseRepository
+from instrumentation import InstrumentedProxy
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+_supabase: Optional[Client] = None
+_repository: Optional[StorageRepository] = None
+_repository_lock = threading.Lock()
 
 def get_supabase_client() -> Client:
-    return supabase
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _supabase
+
+def _create_repository() -> StorageRepository:
+    if settings.STORAGE_BACKEND == "sqlite":
+        from sqlite_repository import SQLiteRepository
+        return InstrumentedProxy(SQLiteRepository(settings.SQLITE_PATH), "sqlite")
+    return InstrumentedProxy(SupabaseRepository(get_supabase_client()), "supabase")
+
+def get_repository() -> StorageRepository:
+    # Created on first use, so importing the services (the backtester, the
+    # benchmarks) needs no storage configured until something reads or writes
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = _create_repository()
+    return _repository
+
+def upsert_in_chunks(
+    table: str,
+    records: List[Dict],
+    on_conflict: str,
+    chunk_size: Optional[int] = None
+) -> Dict:
+    chunk_size = chunk_size or settings.UPSERT_CHUNK_SIZE
+    report = {"written": 0, "failed": 0, "chunks": []}
+
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        try:
+            get_repository().upsert(table, chunk, on_conflict=on_conflict)
+            chunk_report = {"offset": start, "written": len(chunk), "failed": 0}
+        except Exception as e:
+            print(f"Error upserting {table} rows {start}-{start + len(chunk) - 1}: {str(e)}")
+            chunk_report = {"offset": start, "written": 0, "failed": len(chunk)}
+
+        report["written"] += chunk_report["written"]
+        report["failed"] += chunk_report["failed"]
+        report["chunks"].append(chunk_report)
+
+    return report
@@ -0,0 +1,31 @@
+import asyncio
+import contextvars
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+from config import settings
+
+# Supabase/yfinance calls, pandas work and model training each get their own
+# bounded pool so a burst of trainings cannot starve I/O.
+io_executor = ThreadPoolExecutor(max_workers=settings.IO_POOL_SIZE, thread_name_prefix="io")
+compute_executor = ThreadPoolExecutor(max_workers=settings.COMPUTE_POOL_SIZE, thread_name_prefix="compute")
+ml_executor = ThreadPoolExecutor(max_workers=settings.ML_POOL_SIZE, thread_name_prefix="ml")
+
+async def _run_in(executor: Executor, func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry contextvars over, the request trace needs them
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    return await _run_in(io_executor, func, *args, **kwargs)
+
+async def run_compute(func: Callable, *args, **kwargs) -> Any:
+    return await _run_in(compute_executor, func, *args, **kwargs)
+
+async def run_ml(func: Callable, *args, **kwargs) -> Any:
+    return await _run_in(ml_executor, func, *args, **kwargs)
+
+def shutdown_executors(wait: bool = True):
+    for executor in (io_executor, compute_executor, ml_executor):
+        executor.shutdown(wait=wait)
@@ -0,0 +1,167 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+SMA_WINDOWS = (20, 50, 200)
+EMA_WINDOWS = (MACD_FAST, MACD_SLOW)
+BUFFER_SIZE = max(SMA_WINDOWS)
+
+INDICATOR_COLUMNS = [
+    "rsi_14", "macd", "macd_signal", "macd_histogram",
+    "sma_20", "sma_50", "sma_200", "ema_12", "ema_26"
+]
+
+@dataclass
+class IndicatorState:
+    count: np.ndarray
+    last_close: np.ndarray
+    avg_gain: np.ndarray
+    avg_loss: np.ndarray
+    ema: Dict[int, np.ndarray]
+    macd_signal: np.ndarray
+    closes: np.ndarray
+    position: int
+    sums: Dict[int, np.ndarray]
+
+# RSI/MACD/SMA/EMA with the same definitions as the ta library. Accepts a 1-D
+# close series or a 2-D (time, ticker) array where tickers that start trading
+# later may have leading NaNs. compute() returns the full history plus the
+# rolling state; update() advances that state by one bar in O(1).
+class IndicatorEngine:
+    def compute(self, close: np.ndarray) -> Tuple[Dict[str, np.ndarray], IndicatorState]:
+        values = np.asarray(close, dtype=np.float64)
+        squeeze = values.ndim == 1
+        x = values[:, None] if squeeze else values
+
+        observed = ~np.isnan(x)
+        count = np.cumsum(observed, axis=0)
+
+        # ta treats the undefined first diff as a zero move
+        diff = np.diff(x, axis=0, prepend=np.nan)
+        first_row = observed & (count == 1)
+        gain = np.where(first_row, 0.0, np.maximum(diff, 0.0))
+        loss = np.where(first_row, 0.0, np.maximum(-diff, 0.0))
+
+        avg_gain = self._ewm(gain, 1 / RSI_WINDOW)
+        avg_loss = self._ewm(loss, 1 / RSI_WINDOW)
+        ema = {window: self._ewm(x, 2 / (window + 1)) for window in EMA_WINDOWS}
+
+        macd = np.where(count >= MACD_SLOW, ema[MACD_FAST] - ema[MACD_SLOW], np.nan)
+        signal = self._ewm(macd, 2 / (MACD_SIGNAL + 1))
+
+        filled = np.where(observed, x, 0.0)
+        cumulative = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(filled, axis=0)])
+        sums = {}
+        indicators = {
+            "rsi_14": np.where(count >= RSI_WINDOW, self._rsi(avg_gain, avg_loss), np.nan),
+            "macd": macd,
+            "macd_signal": np.where(count >= MACD_SLOW + MACD_SIGNAL - 1, signal, np.nan),
+        }
+        indicators["macd_histogram"] = indicators["macd"] - indicators["macd_signal"]
+
+        for window in SMA_WINDOWS:
+            lagged = np.vstack([np.zeros((window, x.shape[1])), cumulative[:-window]])[:len(x) + 1]
+            window_sum = (cumulative - lagged)[1:]
+            sums[window] = window_sum[-1].copy() if len(x) else np.zeros(x.shape[1])
+            indicators[f"sma_{window}"] = np.where(count >= window, window_sum / window, np.nan)
+
+        for window in EMA_WINDOWS:
+            indicators[f"ema_{window}"] = np.where(count >= window, ema[window], np.nan)
+
+        tail = filled[-BUFFER_SIZE:]
+        closes = np.vstack([np.zeros((BUFFER_SIZE - len(tail), x.shape[1])), tail])
+
+        state = IndicatorState(
+            count=count[-1].copy() if len(x) else np.zeros(x.shape[1], dtype=np.int64),
+            last_close=self._last(x),
+            avg_gain=self._last(avg_gain),
+            avg_loss=self._last(avg_loss),
+            ema={window: self._last(ema[window]) for window in EMA_WINDOWS},
+            macd_signal=self._last(signal),
+            closes=closes,
+            position=0,
+            sums=sums
+        )
+
+        if squeeze:
+            indicators = {name: series[:, 0] for name, series in indicators.items()}
+        return indicators, state
+
+    def update(self, state: IndicatorState, close) -> Dict[str, np.ndarray]:
+        x = np.atleast_1d(np.asarray(close, dtype=np.float64))
+        # A NaN is a ticker that has not started trading yet: like compute(),
+        # it does not count as a bar and adds zero to the SMA sums
+        observed = ~np.isnan(x)
+        filled = np.where(observed, x, 0.0)
+        first = state.count == 0
+
+        diff = x - state.last_close
+        gain = np.where(first, 0.0, np.maximum(diff, 0.0))
+        loss = np.where(first, 0.0, np.maximum(-diff, 0.0))
+        state.avg_gain = self._step(state.avg_gain, gain, 1 / RSI_WINDOW)
+        state.avg_loss = self._step(state.avg_loss, loss, 1 / RSI_WINDOW)
+
+        for window in EMA_WINDOWS:
+            state.ema[window] = self._step(state.ema[window], x, 2 / (window + 1))
+
+        state.count = state.count + observed
+        state.last_close = np.where(observed, x, state.last_close)
+
+        macd = np.where(state.count >= MACD_SLOW, state.ema[MACD_FAST] - state.ema[MACD_SLOW], np.nan)
+        state.macd_signal = np.where(
+            np.isnan(macd), state.macd_signal,
+            self._step(state.macd_signal, macd, 2 / (MACD_SIGNAL + 1))
+        )
+        macd_signal = np.where(state.count >= MACD_SLOW + MACD_SIGNAL - 1, state.macd_signal, np.nan)
+
+        values = {
+            "rsi_14": np.where(state.count >= RSI_WINDOW, self._rsi(state.avg_gain, state.avg_loss), np.nan),
+            "macd": macd,
+            "macd_signal": macd_signal,
+            "macd_histogram": macd - macd_signal,
+        }
+
+        for window in SMA_WINDOWS:
+            leaving = state.closes[(state.position - window) % BUFFER_SIZE]
+            state.sums[window] = state.sums[window] + filled - leaving
+            values[f"sma_{window}"] = np.where(state.count >= window, state.sums[window] / window, np.nan)
+
+        state.closes[state.position] = filled
+        state.position = (state.position + 1) % BUFFER_SIZE
+
+        for window in EMA_WINDOWS:
+            values[f"ema_{window}"] = np.where(state.count >= window, state.ema[window], np.nan)
+
+        return values
+
+    def _ewm(self, values: np.ndarray, alpha: float) -> np.ndarray:
+        # adjust=False recursion, seeded with each column's first observed value.
+        # Runs once over time and is vectorized across tickers.
+        out = np.empty_like(values)
+        if values.shape[1] == 1:
+            # Plain float arithmetic beats per-row numpy calls for a single ticker
+            current = float("nan")
+            for t, value in enumerate(values[:, 0].tolist()):
+                current = value if current != current else current + alpha * (value - current)
+                out[t, 0] = current
+            return out
+
+        current = np.full(values.shape[1], np.nan)
+        for t in range(len(values)):
+            current = self._step(current, values[t], alpha)
+            out[t] = current
+        return out
+
+    def _step(self, current: np.ndarray, value: np.ndarray, alpha: float) -> np.ndarray:
+        return np.where(np.isnan(current), value, current + alpha * (value - current))
+
+    def _rsi(self, avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+
+    def _last(self, values: np.ndarray) -> np.ndarray:
+        return values[-1].copy() if len(values) else np.full(values.shape[1], np.nan)
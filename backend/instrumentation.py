@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+
+    def inc(self, name: str, help_text: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._help.setdefault(name, ("counter", help_text))
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, help_text: str, value: float, buckets: Tuple[float, ...] = DURATION_BUCKETS, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help_text))
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], Dict[Labels, float]]):
+        with self._lock:
+            self._help[name] = ("gauge", help_text)
+            self._gauges[name] = collect
+
+    def render(self) -> str:
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (h.buckets, list(h.counts), h.total, h.sum) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            gauges = dict(self._gauges)
+            help_texts = dict(self._help)
+
+        lines: List[str] = []
+        for name, series in counters.items():
+            _header(lines, name, help_texts[name])
+            for key, value in series.items():
+                lines.append(f"{name}{_format(key)} {value:g}")
+
+        for name, series in histograms.items():
+            _header(lines, name, help_texts[name])
+            for key, (buckets, counts, total, total_sum) in series.items():
+                for bound, count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{_format(key + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_format(key + (('le', '+Inf'),))} {total}")
+                lines.append(f"{name}_sum{_format(key)} {total_sum:.6f}")
+                lines.append(f"{name}_count{_format(key)} {total}")
+
+        for name, collect in gauges.items():
+            try:
+                series = collect()
+            except Exception as e:
+                print(f"Error collecting gauge {name}: {str(e)}")
+                continue
+            _header(lines, name, help_texts[name])
+            for key, value in series.items():
+                lines.append(f"{name}{_format(key)} {float(value):g}")
+
+        return "\n".join(lines) + "\n"
+
+class RequestTrace:
+    # Shared by every task and executor thread working on one request, so
+    # appends go through a lock.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, Tuple[int, float]] = {}
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_call(self, service: str, seconds: float):
+        with self._lock:
+            count, total = self.calls.get(service, (0, 0.0))
+            self.calls[service] = (count + 1, total + seconds)
+
+    def server_timing(self) -> str:
+        with self._lock:
+            parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+            parts += [
+                f'{service};desc="{count} calls";dur={seconds * 1000:.1f}'
+                for service, (count, seconds) in self.calls.items()
+            ]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+metrics = Metrics()
+current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+def get_metrics() -> Metrics:
+    return metrics
+
+@contextmanager
+def span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("analysis_stage_duration_seconds", "Time spent in each analysis stage", elapsed, stage=stage)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_stage(stage, elapsed)
+
+@contextmanager
+def external_call(service: str, operation: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.inc("external_calls_total", "Calls to Supabase, SQLite and yfinance", service=service, operation=operation, outcome=outcome)
+        metrics.observe("external_call_duration_seconds", "Latency of calls to external services", elapsed, service=service, operation=operation)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add_call(service, elapsed)
+
+def timed(stage: str) -> Callable:
+    def decorate(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def run_async(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return run
+    return decorate
+
+class InstrumentedProxy:
+    # Counts every public method call on the wrapped object as an external call
+    def __init__(self, target: Any, service: str):
+        self._target = target
+        self._service = service
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            with external_call(self._service, name):
+                return attribute(*args, **kwargs)
+        return call
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+def _header(lines: List[str], name: str, help_entry: Tuple[str, str]):
+    kind, help_text = help_entry
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
@@ -0,0 +1,106 @@
+import asyncio
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import pandas as pd
+from fastapi import HTTPException
+from config import settings
+
+_worker_service = None
+
+def predict_in_worker(prices_df: pd.DataFrame, model_type: str, prediction_days: int, ticker: str, forecast_mode: str = "recursive") -> Optional[Dict]:
+    global _worker_service
+    if _worker_service is None:
+        from ml_models import MLPredictionService
+        _worker_service = MLPredictionService()
+
+    return _worker_service.predict(
+        prices_df, model_type=model_type, prediction_days=prediction_days,
+        ticker=ticker, forecast_mode=forecast_mode
+    )
+
+class JobQueue:
+    def __init__(self, max_workers: Optional[int] = None, history_size: Optional[int] = None):
+        self.max_workers = max_workers or settings.TRAINING_MAX_WORKERS
+        self.history_size = history_size or settings.JOB_HISTORY_SIZE
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Dict] = {}
+        self._active: Dict[Hashable, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # TensorFlow is not fork-safe, start workers from a clean interpreter
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, key: Hashable, run: Callable[[], Awaitable[Any]]) -> Dict:
+        job_id = self._active.get(key)
+        if job_id:
+            return self._jobs[job_id]
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "key": list(key) if isinstance(key, tuple) else key,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+
+        self._jobs[job_id] = job
+        self._active[key] = job_id
+        self._tasks[job_id] = asyncio.create_task(self._run(key, job, run))
+        self._trim_history()
+        return job
+
+    async def run_in_process(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, key: Hashable, job: Dict, run: Callable[[], Awaitable[Any]]):
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+
+        try:
+            job["result"] = await run()
+            job["status"] = "completed"
+        except HTTPException as e:
+            job["status"] = "failed"
+            job["error"] = e.detail
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._active.pop(key, None)
+            self._tasks.pop(job["id"], None)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("completed", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+job_queue = JobQueue()
+
+def get_job_queue() -> JobQueue:
+    return job_queue
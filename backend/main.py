@@ -1,15 +1,27 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from config import settings
-from models import StockAnalysisRequest, StockAnalysisResponse
-from stock_service import StockDataService
-from technical_indicators import TechnicalIndicatorsService
-from ml_models import MLPredictionService
-from recommendation_engine import RecommendationEngine
-from database import get_supabase_client
+from models import StockAnalysisRequest, StockAnalysisResponse, BatchAnalysisRequest
+from database import get_repository
+from executors import run_io, run_compute, shutdown_executors
+from write_behind import get_write_queue
+from response_cache import get_response_cache
+from market_calendar import last_session_date, market_for_ticker
+from search_index import get_search_index
+from tickers import TICKER_PATTERN
+from screener import get_screener, SORT_FIELDS, MACD_SIGNALS
+from instrumentation import RequestTrace, current_trace, get_metrics, CALL_COUNT_BUCKETS
+from analysis_pipeline import (
+    stock_service, technical_service, ml_service, job_queue,
+    analyze, run_analysis, analyze_from_history, recent_history
+)
 import pandas as pd
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+from datetime import datetime
 
 app = FastAPI(
     title=settings.API_TITLE,
@@ -25,10 +37,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-stock_service = StockDataService()
-technical_service = TechnicalIndicatorsService()
-ml_service = MLPredictionService()
-recommendation_engine = RecommendationEngine()
+repository = get_repository()
+write_queue = get_write_queue()
+response_cache = get_response_cache()
+search_index = get_search_index()
+screener = get_screener()
+metrics = get_metrics()
+
+metrics.gauge(
+    "write_queue_depth", "Write batches waiting for the write-behind thread",
+    lambda: {(): write_queue.stats()["queue_depth"]}
+)
+metrics.gauge(
+    "write_queue_lag_seconds", "Age of the oldest write not yet persisted",
+    lambda: {(): write_queue.stats()["lag_seconds"]}
+)
+metrics.gauge(
+    "response_cache_entries", "Analyses held in the response cache",
+    lambda: {(): response_cache.stats()["entries"]}
+)
+metrics.gauge(
+    "model_registry_warm_bytes", "Memory used by warm models in the registry",
+    lambda: {(): ml_service.registry.stats()["warm_bytes"]}
+)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    trace = RequestTrace()
+    token = current_trace.set(trace)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if settings.SERVER_TIMING_ENABLED:
+            # Streamed responses only report the stages run before the first byte
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+    finally:
+        current_trace.reset(token)
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.observe(
+            "http_request_duration_seconds", "Request latency by route",
+            time.perf_counter() - started, method=request.method, route=path, status=status
+        )
+        for service in (settings.STORAGE_BACKEND, "yfinance"):
+            metrics.observe(
+                "external_calls_per_request", "External calls made while serving one request",
+                trace.calls.get(service, (0, 0.0))[0], buckets=CALL_COUNT_BUCKETS, service=service, route=path
+            )
+
+def _load_search_index():
+    try:
+        search_index.load(repository.list_stocks())
+    except Exception as e:
+        print(f"Error loading stock search index: {str(e)}")
+
+def _load_screener():
+    started_at = time.time()
+    try:
+        screener.load(
+            repository.list_stocks(),
+            repository.list_latest_indicators(),
+            repository.list_latest_recommendations(),
+            started_at
+        )
+    except Exception as e:
+        screener.failed_at = time.time()
+        print(f"Error loading screener snapshot: {str(e)}")
+
+@app.on_event("startup")
+async def startup():
+    app.state.search_index_refresh = asyncio.create_task(run_io(_load_search_index))
+    app.state.screener_refresh = asyncio.create_task(run_io(_load_screener))
+
+    if settings.ML_WARMUP_BACKENDS or settings.ML_WARMUP_TICKERS:
+        # Runs in the background, /health reports when it has finished
+        app.state.warmup = asyncio.create_task(
+            run_io(ml_service.warm_up, settings.ML_WARMUP_BACKENDS, settings.ML_WARMUP_TICKERS)
+        )
+
+@app.on_event("shutdown")
+async def shutdown():
+    job_queue.shutdown()
+    shutdown_executors()
+    write_queue.shutdown()
 
 @app.get("/")
 async def root():
@@ -37,153 +131,246 @@ async def root():
         "version": settings.API_VERSION,
         "endpoints": {
             "analyze": "/api/analyze",
+            "analyze_batch": "/api/analyze/batch",
             "stock": "/api/stock/{ticker}",
             "predictions": "/api/predictions/{stock_id}",
             "recommendations": "/api/recommendations/{stock_id}",
+            "screener": "/api/screener",
+            "models": "/api/models/{ticker}",
+            "jobs": "/api/jobs/{job_id}",
+            "metrics": "/metrics",
             "health": "/health"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    readiness = ml_service.readiness()
+    return {
+        "status": "healthy" if readiness["ready"] else "warming",
+        "timestamp": datetime.now().isoformat(),
+        **readiness
+    }
 
 @app.post("/api/analyze")
-async def analyze_stock(request: StockAnalysisRequest):
-    try:
-        ticker = request.ticker.upper()
-        prediction_days = request.prediction_days
-        model_type = request.model_type
-
-        stock = stock_service.get_or_create_stock(ticker)
-        if not stock:
-            raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
-
-        stock_id = stock["id"]
-
-        stock_info, hist_data = stock_service.fetch_stock_data(ticker, period="2y")
-        if hist_data.empty:
-            raise HTTPException(status_code=404, detail=f"No data available for {ticker}")
-
-        stock_service.save_stock_prices(stock_id, hist_data)
-
-        prices = stock_service.get_historical_prices(stock_id, days=365)
-        if not prices:
-            raise HTTPException(status_code=404, detail="No price data available")
-
-        prices_df = pd.DataFrame(prices)
-
-        indicators_df = technical_service.calculate_indicators(prices_df)
-        if not indicators_df.empty:
-            technical_service.save_indicators(stock_id, indicators_df)
-
-        ml_result = ml_service.predict(prices_df, model_type=model_type, prediction_days=prediction_days)
-        if not ml_result:
-            raise HTTPException(status_code=500, detail="Prediction failed")
-
-        latest_price = stock_service.get_latest_price(stock_id)
-        current_price = float(latest_price["close"])
-
-        latest_indicators = technical_service.get_latest_indicators(stock_id, limit=1)
-        if latest_indicators:
-            latest_ind = latest_indicators[0]
-            latest_ind["close"] = current_price
-            technical_analysis = technical_service.analyze_technical_signals(latest_ind)
-        else:
-            technical_analysis = {"score": 0.5, "signals": [], "sentiment": "neutral"}
-
-        financial_data = stock_service.get_financial_statements(ticker)
-
-        predicted_price = ml_result["predictions"][-1]["price"] if ml_result["predictions"] else current_price
-
-        recommendation_data = recommendation_engine.generate_recommendation(
-            stock_id=stock_id,
-            current_price=current_price,
-            predicted_price=predicted_price,
-            prediction_confidence=ml_result["confidence_score"],
-            technical_analysis=technical_analysis,
-            financial_data=financial_data
+async def analyze_stock(request: StockAnalysisRequest, response: Response):
+    ticker = request.ticker.upper()
+    prediction_days = request.prediction_days
+    model_type = request.model_type
+    forecast_mode = request.forecast_mode
+
+    if request.async_mode:
+        job = job_queue.submit(
+            (ticker, model_type, prediction_days, forecast_mode),
+            lambda: run_analysis(ticker, model_type, prediction_days, forecast_mode, in_background=True)
         )
+        return {"job_id": job["id"], "status": job["status"], "status_url": f"/api/jobs/{job['id']}"}
 
-        saved_recommendation = recommendation_engine.save_recommendation(recommendation_data)
-
-        supabase = get_supabase_client()
-        for pred in ml_result["predictions"][:prediction_days]:
-            pred_data = {
-                "stock_id": stock_id,
-                "target_date": pred["date"],
-                "predicted_price": pred["price"],
-                "model_type": model_type,
-                "confidence_score": ml_result["confidence_score"],
-                "prediction_horizon": prediction_days,
-                "features_used": {"mae": ml_result["mae"], "rmse": ml_result["rmse"]}
-            }
-            supabase.table("predictions").insert(pred_data).execute()
-
-        prev_price = float(prices[0]["close"]) if len(prices) > 1 else current_price
-        price_change = current_price - prev_price
-        price_change_pct = (price_change / prev_price) * 100
-
-        response = {
-            "stock": stock,
-            "latest_price": current_price,
-            "price_change": price_change,
-            "price_change_percent": price_change_pct,
-            "historical_prices": prices[-90:],
-            "technical_indicators": latest_indicators[:30] if latest_indicators else [],
-            "predictions": ml_result["predictions"],
-            "recommendation": saved_recommendation,
-            "financial_summary": financial_data.get("info", {})
-        }
-
-        return response
+    # Daily bars only change once a session closes, so that date scopes the cached result
+    last_bar = last_session_date(market_for_ticker(ticker)).isoformat()
+    cache_key = (ticker, model_type, prediction_days, forecast_mode, last_bar)
 
+    try:
+        result, cache_status = await response_cache.get_or_compute(
+            cache_key,
+            lambda: analyze(ticker, model_type, prediction_days, forecast_mode)
+        )
+        response.headers["X-Cache"] = cache_status
+        return result
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {k: v for k, v in job.items() if k != "result"}
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    return job["result"]
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in request.tickers))
+
+    histories = await run_io(stock_service.fetch_price_histories, tickers, period="2y")
+    recent = {ticker: recent_history(hist) for ticker, hist in histories.items()}
+
+    price_frames = {
+        ticker: pd.DataFrame({
+            "date": hist.index.strftime("%Y-%m-%d"),
+            "close": hist["Close"].astype(float).to_numpy()
+        })
+        for ticker, hist in recent.items()
+    }
+    indicators = await run_compute(technical_service.calculate_indicators_batch, price_frames)
+
+    return StreamingResponse(
+        _stream_batch(tickers, histories, recent, indicators, request),
+        media_type="application/x-ndjson"
+    )
+
+async def _stream_batch(tickers: List[str], histories: Dict, recent: Dict, indicators: Dict, request: BatchAnalysisRequest):
+    limit = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def analyze(ticker: str) -> Dict:
+        async with limit:
+            return await analyze_from_history(
+                ticker, histories[ticker], recent[ticker], indicators.get(ticker, pd.DataFrame()),
+                request.model_type, request.prediction_days, request.forecast_mode
+            )
+
+    for ticker in tickers:
+        if ticker not in recent or recent[ticker].empty:
+            yield _batch_line({"ticker": ticker, "status": "failed", "error": f"No data available for {ticker}"})
+
+    tasks = {
+        asyncio.create_task(analyze(ticker)): ticker
+        for ticker in tickers if ticker in recent and not recent[ticker].empty
+    }
+
+    # Results go out in completion order, not request order
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                ticker = tasks[task]
+                try:
+                    yield _batch_line({"ticker": ticker, "status": "completed", "result": task.result()})
+                except HTTPException as e:
+                    yield _batch_line({"ticker": ticker, "status": "failed", "error": e.detail})
+                except Exception as e:
+                    yield _batch_line({"ticker": ticker, "status": "failed", "error": str(e)})
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _batch_line(item: Dict) -> str:
+    return json.dumps(item, default=str) + "\n"
+
+@app.get("/api/persistence/stats")
+async def persistence_stats():
+    return write_queue.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
 @app.get("/api/stock/{ticker}")
-async def get_stock(ticker: str):
-    stock = stock_service.get_or_create_stock(ticker)
+async def get_stock(ticker: str = Path(pattern=TICKER_PATTERN)):
+    stock = await run_io(stock_service.get_or_create_stock, ticker)
     if not stock:
         raise HTTPException(status_code=404, detail=f"Stock {ticker} not found")
     return stock
 
 @app.get("/api/predictions/{stock_id}")
-async def get_predictions(stock_id: str, limit: int = 30):
-    supabase = get_supabase_client()
-    result = supabase.table("predictions")\
-        .select("*")\
-        .eq("stock_id", stock_id)\
-        .order("prediction_date", desc=True)\
-        .limit(limit)\
-        .execute()
+async def get_predictions(stock_id: str, limit: int = 30, run_id: Optional[str] = None):
+    return await run_io(_get_predictions, stock_id, limit, run_id)
 
-    return result.data if result.data else []
+def _get_predictions(stock_id: str, limit: int, run_id: Optional[str]) -> List[Dict]:
+    # Newest run, then just that run's rows; rows from before run ids fall back to the newest predictions
+    run_id = run_id or repository.get_latest_prediction_run(stock_id)
+    return repository.get_predictions(stock_id, limit, run_id=run_id)
 
 @app.get("/api/recommendations/{stock_id}")
 async def get_recommendations(stock_id: str, limit: int = 10):
-    supabase = get_supabase_client()
-    result = supabase.table("recommendations")\
-        .select("*")\
-        .eq("stock_id", stock_id)\
-        .order("recommendation_date", desc=True)\
-        .limit(limit)\
-        .execute()
-
-    return result.data if result.data else []
+    return await run_io(repository.get_recommendations, stock_id, limit)
+
+@app.delete("/api/models/{ticker}")
+async def invalidate_models(
+    ticker: str = Path(pattern=TICKER_PATTERN),
+    model_type: Optional[str] = Query(None, pattern="^(lstm|xgboost)$")
+):
+    # Removing model directories is blocking disk work
+    removed = await run_io(ml_service.registry.invalidate, ticker, model_type=model_type)
+    response_cache.invalidate(
+        lambda key: key[0] == ticker.upper() and (model_type is None or key[1] == model_type)
+    )
+    return {"ticker": ticker.upper(), "model_type": model_type, "invalidated": removed}
 
 @app.get("/api/stocks/search")
 async def search_stocks(query: str):
-    supabase = get_supabase_client()
-    result = supabase.table("stocks")\
-        .select("*")\
-        .ilike("ticker", f"%{query}%")\
-        .limit(10)\
-        .execute()
-
-    return result.data if result.data else []
+    # Other workers may have added stocks since this index was loaded
+    loaded_at = search_index.loaded_at
+    refresh = getattr(app.state, "search_index_refresh", None)
+    stale = loaded_at and time.time() - loaded_at > settings.SEARCH_INDEX_REFRESH_SECONDS
+    if stale and (refresh is None or refresh.done()):
+        app.state.search_index_refresh = asyncio.create_task(run_io(_load_search_index))
+
+    results = search_index.search(query, 10) if loaded_at else []
+    if results:
+        return results
+    return await run_io(repository.search_stocks, query, 10)
+
+@app.get("/api/screener")
+async def screen_stocks(
+    rsi_min: Optional[float] = Query(None, ge=0, le=100),
+    rsi_max: Optional[float] = Query(None, ge=0, le=100),
+    sma_50: Optional[str] = Query(None, pattern="^(above|below)$"),
+    sma_200: Optional[str] = Query(None, pattern="^(above|below)$"),
+    macd: Optional[str] = Query(None, pattern=f"^({'|'.join(MACD_SIGNALS)})$"),
+    action: Optional[str] = Query(None, pattern="^(buy|hold|sell)(,(buy|hold|sell))*$"),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    sector: Optional[str] = None,
+    country: Optional[str] = None,
+    sort_by: str = Query("ticker", pattern=f"^({'|'.join(SORT_FIELDS)})$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    # Like the search index, reloaded now and then for writes made by other
+    # workers. After a failed load (the views missing, the database down)
+    # requests wait SCREENER_RETRY_SECONDS before triggering another one
+    now = time.time()
+    loaded_at = screener.loaded_at
+    refresh = getattr(app.state, "screener_refresh", None)
+    stale = loaded_at is None or now - loaded_at > settings.SCREENER_REFRESH_SECONDS
+    backing_off = screener.failed_at is not None and now - screener.failed_at < settings.SCREENER_RETRY_SECONDS
+    if stale and not backing_off and (refresh is None or refresh.done()):
+        refresh = app.state.screener_refresh = asyncio.create_task(run_io(_load_screener))
+
+    if loaded_at is None:
+        if refresh is not None and not refresh.done():
+            await asyncio.shield(refresh)
+        if screener.loaded_at is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Screener data is not available yet",
+                headers={"Retry-After": str(settings.SCREENER_RETRY_SECONDS)}
+            )
+
+    # Rows hold only JSON types, skipping jsonable_encoder keeps large pages fast
+    return JSONResponse(screener.query(
+        rsi_min=rsi_min,
+        rsi_max=rsi_max,
+        sma_50=sma_50,
+        sma_200=sma_200,
+        macd=macd,
+        actions=action.split(",") if action else None,
+        min_confidence=min_confidence,
+        sector=sector,
+        country=country,
+        sort_by=sort_by,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset
+    ))
 
 if __name__ == "__main__":
     import uvicorn
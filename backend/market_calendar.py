@@ -0,0 +1,62 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+# Regular sessions only; exchange holidays are treated as trading days.
+MARKETS: Dict[str, Dict] = {
+    "US": {"timezone": ZoneInfo("America/New_York"), "open": time(9, 30), "close": time(16, 0)},
+    "ID": {"timezone": ZoneInfo("Asia/Jakarta"), "open": time(9, 0), "close": time(16, 0)},
+}
+
+def market_for_ticker(ticker: str) -> str:
+    return "ID" if ".JK" in ticker.upper() else "US"
+
+def market_now(market: str, now: Optional[datetime] = None) -> datetime:
+    tz = MARKETS[market]["timezone"]
+    if now is None:
+        return datetime.now(tz)
+    if now.tzinfo is None:
+        now = now.astimezone()
+    return now.astimezone(tz)
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5
+
+def is_market_open(market: str, now: Optional[datetime] = None) -> bool:
+    now = market_now(market, now)
+    session = MARKETS[market]
+    return is_trading_day(now.date()) and session["open"] <= now.time() < session["close"]
+
+def _next_session_time(market: str, at: time, now: Optional[datetime]) -> datetime:
+    now = market_now(market, now)
+    tz = MARKETS[market]["timezone"]
+    day = now.date()
+
+    while True:
+        candidate = datetime.combine(day, at, tzinfo=tz)
+        if is_trading_day(day) and candidate > now:
+            return candidate
+        day += timedelta(days=1)
+
+def next_open(market: str, now: Optional[datetime] = None) -> datetime:
+    return _next_session_time(market, MARKETS[market]["open"], now)
+
+def next_close(market: str, now: Optional[datetime] = None) -> datetime:
+    return _next_session_time(market, MARKETS[market]["close"], now)
+
+def last_session_date(market: str, now: Optional[datetime] = None) -> date:
+    now = market_now(market, now)
+    day = now.date()
+    if not is_trading_day(day) or now.time() < MARKETS[market]["close"]:
+        day -= timedelta(days=1)
+
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+def history_expiry(market: str, fetched_at: datetime, ttl_seconds: int) -> datetime:
+    # Daily bars only move while the session is open; once closed they are
+    # final until the next open.
+    if is_market_open(market, fetched_at):
+        return min(fetched_at + timedelta(seconds=ttl_seconds), next_close(market, fetched_at))
+    return next_open(market, fetched_at)
@@ -0,0 +1,246 @@
+import os
+import pickle
+import threading
+import time
+import yfinance as yf
+import pandas as pd
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import settings
+from market_calendar import MARKETS, market_for_ticker, history_expiry
+from instrumentation import external_call
+from tickers import ticker_path
+
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+STATEMENT_ATTRIBUTES = {
+    "income_statement": "income_stmt",
+    "balance_sheet": "balance_sheet",
+    "cash_flow": "cashflow",
+}
+
+class MarketDataCache:
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir or settings.MARKET_DATA_CACHE_DIR)
+        self._memory: Dict[Tuple[str, str], Dict] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def get_history(self, ticker: str, period: str = "2y", start: Optional[str] = None) -> pd.DataFrame:
+        ticker = ticker.upper()
+        needed_from = self._history_start(period, start)
+
+        with self._lock(ticker, "history"):
+            entry = self._load(ticker, "history")
+            if entry and entry["covers_from"] <= needed_from:
+                if entry["expires_at"] <= time.time():
+                    entry = self._refresh_history(ticker, entry)
+            else:
+                entry = self._fetch_history(ticker, needed_from, period if start is None else None)
+
+        return self._window(entry["data"], needed_from)
+
+    def get_histories(self, tickers: List[str], period: str = "2y") -> Dict[str, pd.DataFrame]:
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        needed_from = self._history_start(period, None)
+
+        histories = {}
+        missing = []
+        for ticker in tickers:
+            entry = self._load(ticker, "history")
+            if entry and entry["covers_from"] <= needed_from and entry["expires_at"] > time.time():
+                histories[ticker] = entry["data"]
+            else:
+                missing.append(ticker)
+
+        # Everything not fresh in the cache comes back in a single bulk request
+        for ticker, hist in self._download_histories(missing, period).items():
+            with self._lock(ticker, "history"):
+                self._store(ticker, "history", self._history_entry(ticker, hist, needed_from))
+            histories[ticker] = hist
+
+        return {ticker: self._window(histories[ticker], needed_from) for ticker in tickers if ticker in histories}
+
+    def get_info(self, ticker: str) -> Dict[str, Any]:
+        return self._get_or_fetch(
+            ticker.upper(), "info", settings.INFO_CACHE_TTL,
+            lambda stock: stock.info or {}
+        )
+
+    def get_statements(self, ticker: str) -> Dict[str, pd.DataFrame]:
+        return self._get_or_fetch(
+            ticker.upper(), "statements", settings.STATEMENTS_CACHE_TTL,
+            lambda stock: {name: self._statement(stock, attribute) for name, attribute in STATEMENT_ATTRIBUTES.items()}
+        )
+
+    def _statement(self, stock: yf.Ticker, attribute: str) -> pd.DataFrame:
+        # Each access of a statement property is a Yahoo request, so it is read once
+        statement = getattr(stock, attribute, None)
+        return statement if statement is not None else pd.DataFrame()
+
+    def invalidate(self, ticker: str, kind: Optional[str] = None):
+        ticker = ticker.upper()
+        kinds = [kind] if kind else ["history", "info", "statements"]
+
+        for name in kinds:
+            self._memory.pop((ticker, name), None)
+            path = self._path(ticker, name)
+            if path.exists():
+                path.unlink()
+
+    def _history_start(self, period: str, start: Optional[str]) -> date:
+        if start:
+            return pd.Timestamp(start).date()
+        if period not in PERIOD_OFFSETS:
+            return date.min
+        return (pd.Timestamp.now().normalize() - PERIOD_OFFSETS[period]).date()
+
+    def _window(self, hist: pd.DataFrame, needed_from: date) -> pd.DataFrame:
+        if hist.empty or needed_from == date.min:
+            return hist
+        return hist[hist.index.date >= needed_from]
+
+    def _download_histories(self, tickers: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        if not tickers:
+            return {}
+
+        try:
+            with external_call("yfinance", "download"):
+                data = yf.download(
+                    tickers, period=period, group_by="ticker", auto_adjust=True,
+                    threads=True, progress=False
+                )
+        except Exception as e:
+            print(f"Error downloading history for {len(tickers)} tickers: {str(e)}")
+            return {}
+
+        if data is None or data.empty:
+            return {}
+
+        histories = {}
+        downloaded = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker not in downloaded:
+                continue
+
+            hist = data[ticker].dropna(subset=["Close"])
+            if hist.empty:
+                continue
+
+            # Bulk downloads drop the timezone, Ticker.history keeps the exchange's
+            if hist.index.tz is None:
+                hist.index = hist.index.tz_localize(MARKETS[market_for_ticker(ticker)]["timezone"])
+            histories[ticker] = hist
+
+        return histories
+
+    def _fetch_history(self, ticker: str, needed_from: date, period: Optional[str]) -> Dict:
+        stock = yf.Ticker(ticker)
+        with external_call("yfinance", "history"):
+            if period:
+                hist = stock.history(period=period)
+            else:
+                hist = stock.history(start=needed_from.strftime("%Y-%m-%d"))
+
+        entry = self._history_entry(ticker, hist, needed_from)
+        if not hist.empty:
+            self._store(ticker, "history", entry)
+        return entry
+
+    def _refresh_history(self, ticker: str, entry: Dict) -> Dict:
+        cached = entry["data"]
+        if cached.empty:
+            return self._fetch_history(ticker, entry["covers_from"], None)
+
+        last_date = cached.index[-1].date()
+        try:
+            with external_call("yfinance", "history"):
+                new_bars = yf.Ticker(ticker).history(start=last_date.strftime("%Y-%m-%d"))
+        except Exception as e:
+            print(f"Error refreshing cached history for {ticker}: {str(e)}")
+            return entry
+
+        if new_bars.empty:
+            merged = cached
+        else:
+            merged = pd.concat([cached[cached.index.date < last_date], new_bars])
+
+        refreshed = self._history_entry(ticker, merged, entry["covers_from"])
+        self._store(ticker, "history", refreshed)
+        return refreshed
+
+    def _history_entry(self, ticker: str, hist: pd.DataFrame, covers_from: date) -> Dict:
+        fetched_at = datetime.now(timezone.utc)
+        expires_at = history_expiry(market_for_ticker(ticker), fetched_at, settings.HISTORY_CACHE_TTL)
+        return {
+            "data": hist,
+            "covers_from": covers_from,
+            "fetched_at": fetched_at.timestamp(),
+            "expires_at": expires_at.timestamp()
+        }
+
+    def _get_or_fetch(self, ticker: str, kind: str, ttl: int, fetcher: Callable[[yf.Ticker], Any]) -> Any:
+        with self._lock(ticker, kind):
+            entry = self._load(ticker, kind)
+            if entry and entry["expires_at"] > time.time():
+                return entry["data"]
+
+            with external_call("yfinance", kind):
+                data = fetcher(yf.Ticker(ticker))
+            now = time.time()
+            self._store(ticker, kind, {"data": data, "fetched_at": now, "expires_at": now + ttl})
+            return data
+
+    def _lock(self, ticker: str, kind: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((ticker, kind), threading.Lock())
+
+    def _path(self, ticker: str, kind: str) -> Path:
+        # Entries are unpickled on read, so nothing may land outside cache_dir
+        return ticker_path(self.cache_dir, ticker) / f"{kind}.pkl"
+
+    def _load(self, ticker: str, kind: str) -> Optional[Dict]:
+        entry = self._memory.get((ticker, kind))
+        if entry is not None:
+            return entry
+
+        path = self._path(ticker, kind)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            print(f"Error reading market data cache {path}: {str(e)}")
+            return None
+
+        self._memory[(ticker, kind)] = entry
+        return entry
+
+    def _store(self, ticker: str, kind: str, entry: Dict):
+        self._memory[(ticker, kind)] = entry
+
+        path = self._path(ticker, kind)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing market data cache {path}: {str(e)}")
+
+market_data_cache = MarketDataCache()
+
+def get_market_data_cache() -> MarketDataCache:
+    return market_data_cache
@@ -0,0 +1,77 @@
+import importlib
+import importlib.util
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+BACKENDS = ("sklearn", "xgboost", "tensorflow")
+
+# Importing xgboost, sklearn and especially TensorFlow costs seconds and
+# hundreds of MB, so they are imported on first use (or by the warm-up)
+# rather than when the API starts.
+class MLBackends:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._available: Dict[str, bool] = {}
+        self._modules: Dict[str, ModuleType] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def available(self, backend: str) -> bool:
+        if backend not in self._available:
+            # find_spec locates the package without executing it
+            self._available[backend] = importlib.util.find_spec(backend) is not None
+        return self._available[backend]
+
+    def module(self, name: str) -> ModuleType:
+        # sys.modules can hold a module another thread is still importing,
+        # only modules whose import finished are returned without the lock
+        loaded = self._modules.get(name)
+        if loaded is not None:
+            return loaded
+
+        backend = name.split(".")[0]
+        with self._lock:
+            if name in self._modules:
+                return self._modules[name]
+
+            started = time.perf_counter()
+            try:
+                module = importlib.import_module(name)
+            except Exception as e:
+                self._errors[backend] = str(e)
+                raise
+            self._load_seconds[backend] = self._load_seconds.get(backend, 0.0) + time.perf_counter() - started
+            self._modules[name] = module
+            return module
+
+    def load(self, backend: str) -> Optional[ModuleType]:
+        if not self.available(backend):
+            return None
+        try:
+            if backend == "tensorflow":
+                return self.module("tensorflow.keras")
+            if backend == "sklearn":
+                self.module("sklearn.metrics")
+                return self.module("sklearn.preprocessing")
+            return self.module(backend)
+        except Exception as e:
+            print(f"Error loading {backend}: {str(e)}")
+            return None
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            backend: {
+                "available": self.available(backend),
+                "loaded": any(name.split(".")[0] == backend for name in list(self._modules)),
+                "load_seconds": round(self._load_seconds[backend], 3) if backend in self._load_seconds else None,
+                "error": self._errors.get(backend)
+            }
+            for backend in BACKENDS
+        }
+
+ml_backends = MLBackends()
+
+def get_ml_backends() -> MLBackends:
+    return ml_backends
@@ -1,74 +1,147 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-import xgboost as xgb
-from typing import Tuple, Dict, List
+from typing import Any, Callable, Optional, Tuple, Dict, List, TYPE_CHECKING
+from config import settings
+from model_registry import get_model_registry
+from ml_backends import get_ml_backends
+from instrumentation import timed
 import warnings
 warnings.filterwarnings('ignore')
 
-try:
-    from tensorflow import keras
-    from tensorflow.keras.models import Sequential
-    from tensorflow.keras.layers import LSTM, Dense, Dropout
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
+if TYPE_CHECKING:
+    from sklearn.preprocessing import MinMaxScaler
+
+backends = get_ml_backends()
+TENSORFLOW_AVAILABLE = backends.available("tensorflow")
 
 class MLPredictionService:
     def __init__(self):
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
-
-    def prepare_data(self, prices_df: pd.DataFrame, lookback: int = 60) -> Tuple[np.ndarray, np.ndarray, MinMaxScaler]:
-        df = prices_df.copy()
-        df = df.sort_values('date')
-
-        data = df[['close']].values
-        scaled_data = self.scaler.fit_transform(data)
-
-        X, y = [], []
-        for i in range(lookback, len(scaled_data)):
-            X.append(scaled_data[i-lookback:i, 0])
-            y.append(scaled_data[i, 0])
-
-        return np.array(X), np.array(y), self.scaler
-
-    def predict_with_xgboost(self, prices_df: pd.DataFrame, prediction_days: int = 30) -> Dict:
+        self.registry = get_model_registry()
+        self.warmup = {"status": "idle", "backends": [], "models": 0, "error": None}
+
+    def prepare_data(self, prices_df: pd.DataFrame, lookback: int = 60, dtype: Any = np.float64, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray, "MinMaxScaler"]:
+        closes = self._closes(prices_df).reshape(-1, 1)
+
+        # Fitted per call so concurrent requests never share scaling state
+        scaler = backends.module("sklearn.preprocessing").MinMaxScaler(feature_range=(0, 1))
+        scaled_data = scaler.fit_transform(closes)[:, 0].astype(dtype, copy=False)
+
+        if len(scaled_data) < lookback + horizon:
+            y_shape = (0, horizon) if horizon > 1 else (0,)
+            return np.empty((0, lookback), dtype=dtype), np.empty(y_shape, dtype=dtype), scaler
+
+        # Each row is a read-only view into scaled_data: lookback inputs followed by the targets
+        windows = sliding_window_view(scaled_data, lookback + horizon)
+        y = windows[:, lookback:] if horizon > 1 else windows[:, lookback]
+        return windows[:, :lookback], y, scaler
+
+    def latest_window(self, prices_df: pd.DataFrame, scaler: "MinMaxScaler", lookback: int = 60) -> np.ndarray:
+        closes = self._closes(prices_df).reshape(-1, 1)
+        return scaler.transform(closes[-lookback:])[:, 0].astype(np.float32)
+
+    def _closes(self, prices_df: pd.DataFrame) -> np.ndarray:
+        # Frames from the price store are already ordered, their closes are read in place
+        if not prices_df['date'].is_monotonic_increasing:
+            prices_df = prices_df.sort_values('date')
+        return prices_df['close'].to_numpy(dtype=np.float64)
+
+    def _get_or_train(self, ticker: Optional[str], model_type: str, lookback: int, prices_df: pd.DataFrame, train: Callable, variant: str = "recursive") -> Tuple[Any, Dict]:
+        if not ticker:
+            return train()
+
+        fingerprint = self.registry.fingerprint(prices_df)
+        cached = self.registry.get(ticker, model_type, lookback, fingerprint, variant=variant)
+        if cached:
+            return cached["model"], cached["metrics"]
+
+        model, metrics = train()
+        self.registry.put(ticker, model_type, lookback, fingerprint, model, metrics, variant=variant)
+        return model, metrics
+
+    def _evaluate(self, y_test: np.ndarray, y_pred: np.ndarray) -> Dict:
+        sk_metrics = backends.module("sklearn.metrics")
+        mae = sk_metrics.mean_absolute_error(y_test, y_pred)
+        rmse = np.sqrt(sk_metrics.mean_squared_error(y_test, y_pred))
+
+        confidence = max(0.5, min(0.95, 1 - (rmse * 2)))
+
+        return {"mae": float(mae), "rmse": float(rmse), "confidence": float(confidence)}
+
+    @timed("model_fit")
+    def _train_xgboost(self, X: np.ndarray, y: np.ndarray) -> Tuple[Any, Dict]:
+        split = int(len(X) * 0.8)
+        X_train, X_test = X[:split], X[split:]
+        y_train, y_test = y[:split], y[split:]
+
+        model = backends.module("xgboost").XGBRegressor(
+            objective='reg:squarederror',
+            n_estimators=100,
+            max_depth=5,
+            learning_rate=0.1,
+            random_state=42
+        )
+
+        model.fit(X_train, y_train)
+
+        return model, self._evaluate(y_test, model.predict(X_test))
+
+    @timed("model_fit")
+    def _train_lstm(self, X: np.ndarray, y: np.ndarray) -> Tuple[Any, Dict]:
+        split = int(len(X) * 0.8)
+        X_train, X_test = X[:split], X[split:]
+        y_train, y_test = y[:split], y[split:]
+
+        keras = backends.module("tensorflow.keras")
+        model = keras.models.Sequential([
+            keras.layers.LSTM(50, return_sequences=True, input_shape=(X_train.shape[1], 1)),
+            keras.layers.Dropout(0.2),
+            keras.layers.LSTM(50, return_sequences=False),
+            keras.layers.Dropout(0.2),
+            keras.layers.Dense(25),
+            keras.layers.Dense(y.shape[1] if y.ndim > 1 else 1)
+        ])
+
+        model.compile(optimizer='adam', loss='mean_squared_error')
+        model.fit(
+            X_train, y_train,
+            batch_size=32,
+            epochs=10,
+            validation_split=0.1,
+            verbose=0
+        )
+
+        return model, self._evaluate(y_test, model.predict(X_test, verbose=0))
+
+    def predict_with_xgboost(self, prices_df: pd.DataFrame, prediction_days: int = 30, ticker: Optional[str] = None, forecast_mode: str = "recursive") -> Dict:
         try:
-            X, y, scaler = self.prepare_data(prices_df, lookback=60)
+            # Direct mode trains one output per future day and forecasts them in a single call
+            horizon = prediction_days if forecast_mode == "direct" else 1
+            X, y, scaler = self.prepare_data(prices_df, lookback=60, dtype=np.float32, horizon=horizon)
 
             if len(X) < 100:
                 raise ValueError("Insufficient data for training")
 
-            split = int(len(X) * 0.8)
-            X_train, X_test = X[:split], X[split:]
-            y_train, y_test = y[:split], y[split:]
-
-            model = xgb.XGBRegressor(
-                objective='reg:squarederror',
-                n_estimators=100,
-                max_depth=5,
-                learning_rate=0.1,
-                random_state=42
+            model, metrics = self._get_or_train(
+                ticker, "xgboost", 60, prices_df,
+                lambda: self._train_xgboost(X, y),
+                variant=self._variant(forecast_mode, horizon)
             )
+            mae, rmse, confidence = metrics["mae"], metrics["rmse"], metrics["confidence"]
 
-            model.fit(X_train, y_train)
-
-            y_pred = model.predict(X_test)
-            mae = mean_absolute_error(y_test, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+            if forecast_mode == "direct":
+                latest = self.latest_window(prices_df, scaler, lookback=60)
+                predictions = model.predict(latest.reshape(1, -1))[0]
+            else:
+                last_sequence = X[-1].reshape(1, -1)
+                predictions = []
 
-            confidence = max(0.5, min(0.95, 1 - (rmse * 2)))
+                for i in range(prediction_days):
+                    next_pred = model.predict(last_sequence)[0]
+                    predictions.append(next_pred)
 
-            last_sequence = X[-1].reshape(1, -1)
-            predictions = []
-
-            for i in range(prediction_days):
-                next_pred = model.predict(last_sequence)[0]
-                predictions.append(next_pred)
-
-                last_sequence = np.roll(last_sequence, -1)
-                last_sequence[0, -1] = next_pred
+                    last_sequence = np.roll(last_sequence, -1)
+                    last_sequence[0, -1] = next_pred
 
             predictions_actual = scaler.inverse_transform(
                 np.array(predictions).reshape(-1, 1)
@@ -92,62 +165,48 @@ class MLPredictionService:
                 "confidence_score": float(confidence),
                 "mae": float(mae),
                 "rmse": float(rmse),
-                "model_type": "xgboost"
+                "model_type": "xgboost",
+                "forecast_mode": forecast_mode
             }
 
         except Exception as e:
             print(f"XGBoost prediction error: {str(e)}")
             return None
 
-    def predict_with_lstm(self, prices_df: pd.DataFrame, prediction_days: int = 30) -> Dict:
+    def predict_with_lstm(self, prices_df: pd.DataFrame, prediction_days: int = 30, ticker: Optional[str] = None, forecast_mode: str = "recursive") -> Dict:
         if not TENSORFLOW_AVAILABLE:
             return None
 
         try:
-            X, y, scaler = self.prepare_data(prices_df, lookback=60)
+            # Direct mode trains one output per future day and forecasts them in a single call
+            horizon = prediction_days if forecast_mode == "direct" else 1
+            X, y, scaler = self.prepare_data(prices_df, lookback=60, dtype=np.float32, horizon=horizon)
 
             if len(X) < 100:
                 raise ValueError("Insufficient data for training")
 
             X = X.reshape((X.shape[0], X.shape[1], 1))
 
-            split = int(len(X) * 0.8)
-            X_train, X_test = X[:split], X[split:]
-            y_train, y_test = y[:split], y[split:]
-
-            model = Sequential([
-                LSTM(50, return_sequences=True, input_shape=(X_train.shape[1], 1)),
-                Dropout(0.2),
-                LSTM(50, return_sequences=False),
-                Dropout(0.2),
-                Dense(25),
-                Dense(1)
-            ])
-
-            model.compile(optimizer='adam', loss='mean_squared_error')
-            model.fit(
-                X_train, y_train,
-                batch_size=32,
-                epochs=10,
-                validation_split=0.1,
-                verbose=0
+            model, metrics = self._get_or_train(
+                ticker, "lstm", 60, prices_df,
+                lambda: self._train_lstm(X, y),
+                variant=self._variant(forecast_mode, horizon)
             )
+            mae, rmse, confidence = metrics["mae"], metrics["rmse"], metrics["confidence"]
 
-            y_pred = model.predict(X_test, verbose=0)
-            mae = mean_absolute_error(y_test, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-
-            confidence = max(0.5, min(0.95, 1 - (rmse * 2)))
-
-            last_sequence = X[-1].reshape(1, X.shape[1], 1)
-            predictions = []
+            if forecast_mode == "direct":
+                latest = self.latest_window(prices_df, scaler, lookback=60)
+                predictions = model.predict(latest.reshape(1, -1, 1), verbose=0)[0]
+            else:
+                last_sequence = X[-1].reshape(1, X.shape[1], 1)
+                predictions = []
 
-            for i in range(prediction_days):
-                next_pred = model.predict(last_sequence, verbose=0)[0, 0]
-                predictions.append(next_pred)
+                for i in range(prediction_days):
+                    next_pred = model.predict(last_sequence, verbose=0)[0, 0]
+                    predictions.append(next_pred)
 
-                last_sequence = np.roll(last_sequence, -1, axis=1)
-                last_sequence[0, -1, 0] = next_pred
+                    last_sequence = np.roll(last_sequence, -1, axis=1)
+                    last_sequence[0, -1, 0] = next_pred
 
             predictions_actual = scaler.inverse_transform(
                 np.array(predictions).reshape(-1, 1)
@@ -171,15 +230,45 @@ class MLPredictionService:
                 "confidence_score": float(confidence),
                 "mae": float(mae),
                 "rmse": float(rmse),
-                "model_type": "lstm"
+                "model_type": "lstm",
+                "forecast_mode": forecast_mode
             }
 
         except Exception as e:
             print(f"LSTM prediction error: {str(e)}")
             return None
 
-    def predict(self, prices_df: pd.DataFrame, model_type: str = "xgboost", prediction_days: int = 30) -> Dict:
+    def warm_up(self, backend_names: List[str], tickers: List[str]):
+        self.warmup = {"status": "warming", "backends": [], "models": 0, "error": None}
+        try:
+            for backend in backend_names:
+                if backends.load(backend) is not None:
+                    self.warmup["backends"].append(backend)
+
+            for ticker in tickers:
+                self.warmup["models"] += self.registry.preload(ticker)
+
+            self.warmup["status"] = "ready"
+        except Exception as e:
+            print(f"Error warming up models: {str(e)}")
+            self.warmup["status"] = "failed"
+            self.warmup["error"] = str(e)
+
+    def readiness(self) -> Dict:
+        # Workers without a warm-up configured are ready as soon as they start
+        warming = settings.ML_WARMUP_BACKENDS or settings.ML_WARMUP_TICKERS
+        return {
+            "ready": not warming or self.warmup["status"] in ("ready", "failed"),
+            "warmup": self.warmup,
+            "backends": backends.status()
+        }
+
+    def _variant(self, forecast_mode: str, horizon: int) -> str:
+        return f"direct{horizon}" if forecast_mode == "direct" else "recursive"
+
+    @timed("forecast")
+    def predict(self, prices_df: pd.DataFrame, model_type: str = "xgboost", prediction_days: int = 30, ticker: Optional[str] = None, forecast_mode: str = "recursive") -> Dict:
         if model_type == "lstm" and TENSORFLOW_AVAILABLE:
-            return self.predict_with_lstm(prices_df, prediction_days)
+            return self.predict_with_lstm(prices_df, prediction_days, ticker=ticker, forecast_mode=forecast_mode)
         else:
-            return self.predict_with_xgboost(prices_df, prediction_days)
+            return self.predict_with_xgboost(prices_df, prediction_days, ticker=ticker, forecast_mode=forecast_mode)
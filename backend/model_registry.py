@@ -0,0 +1,177 @@
+import hashlib
+import json
+import shutil
+import threading
+import pandas as pd
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import settings
+from ml_backends import get_ml_backends
+from tickers import ticker_path
+
+MODEL_FILES = {
+    "xgboost": "model.json",
+    "lstm": "model.keras",
+}
+
+class ModelRegistry:
+    def __init__(self, model_dir: Optional[str] = None, memory_budget_mb: Optional[int] = None):
+        self.model_dir = Path(model_dir or settings.MODEL_REGISTRY_DIR)
+        self.memory_budget = (memory_budget_mb or settings.MODEL_CACHE_MEMORY_MB) * 1024 * 1024
+        self._warm: "OrderedDict[str, Dict]" = OrderedDict()
+        self._warm_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(prices_df: pd.DataFrame) -> str:
+        df = prices_df if prices_df["date"].is_monotonic_increasing else prices_df.sort_values("date")
+        closes = df["close"].to_numpy(dtype=float)
+        last_date = pd.Timestamp(df["date"].iloc[-1]).strftime("%Y-%m-%d")
+        digest = hashlib.sha1(closes.tobytes()).hexdigest()[:16]
+        return f"{last_date}-{len(closes)}-{digest}"
+
+    def get(self, ticker: str, model_type: str, lookback: int, fingerprint: str, variant: str = "recursive") -> Optional[Dict]:
+        key = self._key(ticker, model_type, lookback, fingerprint, variant)
+
+        with self._lock:
+            entry = self._warm.get(key)
+            if entry is not None:
+                self._warm.move_to_end(key)
+                return entry
+
+        path = self._entry_dir(ticker, model_type, lookback, variant) / fingerprint
+        if not (path / MODEL_FILES[model_type]).exists():
+            return None
+
+        try:
+            model = self._load_model(model_type, path / MODEL_FILES[model_type])
+            with open(path / "meta.json") as f:
+                metrics = json.load(f)
+        except Exception as e:
+            print(f"Error loading {model_type} model for {ticker}: {str(e)}")
+            return None
+
+        entry = {"model": model, "metrics": metrics}
+        self._remember(key, entry, model_type)
+        return entry
+
+    def put(self, ticker: str, model_type: str, lookback: int, fingerprint: str, model: Any, metrics: Dict, variant: str = "recursive"):
+        base_dir = self._entry_dir(ticker, model_type, lookback, variant)
+        path = base_dir / fingerprint
+
+        try:
+            # A model trained on newer bars supersedes the older ones on disk
+            if base_dir.exists():
+                shutil.rmtree(base_dir)
+            path.mkdir(parents=True, exist_ok=True)
+            self._save_model(model_type, model, path / MODEL_FILES[model_type])
+            with open(path / "meta.json", "w") as f:
+                json.dump(metrics, f)
+        except Exception as e:
+            print(f"Error saving {model_type} model for {ticker}: {str(e)}")
+
+        prefix = self._key(ticker, model_type, lookback, "", variant)
+        with self._lock:
+            for stale_key in [k for k in self._warm if k.startswith(prefix)]:
+                self._evict(stale_key)
+
+        self._remember(self._key(ticker, model_type, lookback, fingerprint, variant), {"model": model, "metrics": metrics}, model_type)
+
+    def preload(self, ticker: str, model_type: Optional[str] = None) -> int:
+        ticker_dir = ticker_path(self.model_dir, ticker)
+        if not ticker_dir.exists():
+            return 0
+
+        loaded = 0
+        for entry_dir in ticker_dir.iterdir():
+            # Anything the registry did not write (stray files, renamed
+            # directories) is skipped rather than failing the warm-up
+            parts = entry_dir.name.split("-", 2)
+            if not entry_dir.is_dir() or len(parts) != 3 or not parts[1].isdigit():
+                continue
+            entry_type, lookback, variant = parts
+            if entry_type not in MODEL_FILES or (model_type and entry_type != model_type):
+                continue
+            if entry_type == "lstm" and not get_ml_backends().available("tensorflow"):
+                continue
+            for fingerprint_dir in entry_dir.iterdir():
+                if fingerprint_dir.is_dir() and self.get(ticker, entry_type, int(lookback), fingerprint_dir.name, variant=variant):
+                    loaded += 1
+
+        return loaded
+
+    def invalidate(self, ticker: str, model_type: Optional[str] = None) -> int:
+        ticker_dir = ticker_path(self.model_dir, ticker)
+        ticker = ticker_dir.name
+        prefix = f"{ticker}/{model_type}-" if model_type else f"{ticker}/"
+
+        with self._lock:
+            evicted = [k for k in self._warm if k.startswith(prefix)]
+            for key in evicted:
+                self._evict(key)
+
+        removed = 0
+        if ticker_dir.exists():
+            for entry_dir in ticker_dir.iterdir():
+                if not entry_dir.is_dir():
+                    continue
+                if model_type is None or entry_dir.name.startswith(f"{model_type}-"):
+                    shutil.rmtree(entry_dir)
+                    removed += 1
+
+        return max(removed, len(evicted))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "warm_models": len(self._warm),
+                "warm_bytes": self._warm_bytes,
+                "memory_budget_bytes": self.memory_budget
+            }
+
+    def _key(self, ticker: str, model_type: str, lookback: int, fingerprint: str, variant: str) -> str:
+        return f"{ticker.upper()}/{model_type}-{lookback}-{variant}/{fingerprint}"
+
+    def _entry_dir(self, ticker: str, model_type: str, lookback: int, variant: str) -> Path:
+        return ticker_path(self.model_dir, ticker) / f"{model_type}-{lookback}-{variant}"
+
+    def _remember(self, key: str, entry: Dict, model_type: str):
+        entry["size"] = self._model_size(model_type, entry["model"])
+
+        with self._lock:
+            if key in self._warm:
+                self._evict(key)
+            self._warm[key] = entry
+            self._warm_bytes += entry["size"]
+
+            while self._warm_bytes > self.memory_budget and len(self._warm) > 1:
+                self._evict(next(iter(self._warm)))
+
+    def _evict(self, key: str):
+        entry = self._warm.pop(key)
+        self._warm_bytes -= entry["size"]
+
+    def _model_size(self, model_type: str, model: Any) -> int:
+        if model_type == "xgboost":
+            return len(model.get_booster().save_raw())
+        return model.count_params() * 4
+
+    def _save_model(self, model_type: str, model: Any, path: Path):
+        if model_type == "xgboost":
+            model.save_model(str(path))
+        else:
+            model.save(str(path))
+
+    def _load_model(self, model_type: str, path: Path) -> Any:
+        if model_type == "xgboost":
+            model = get_ml_backends().module("xgboost").XGBRegressor()
+            model.load_model(str(path))
+            return model
+
+        return get_ml_backends().module("tensorflow.keras").models.load_model(str(path))
+
+model_registry = ModelRegistry()
+
+def get_model_registry() -> ModelRegistry:
+    return model_registry
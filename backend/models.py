@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Annotated, Optional, Dict, Any, List
 from datetime import date, datetime
 from decimal import Decimal
+from tickers import TICKER_PATTERN
 
 class StockBase(BaseModel):
     ticker: str
@@ -65,6 +66,7 @@ class Prediction(BaseModel):
     confidence_score: float
     prediction_horizon: int
     features_used: Optional[Dict[str, Any]] = None
+    run_id: Optional[str] = None
     created_at: datetime
 
 class PredictionCreate(BaseModel):
@@ -75,6 +77,7 @@ class PredictionCreate(BaseModel):
     confidence_score: float
     prediction_horizon: int
     features_used: Optional[Dict[str, Any]] = None
+    run_id: Optional[str] = None
 
 class Recommendation(BaseModel):
     id: str
@@ -104,9 +107,17 @@ class RecommendationCreate(BaseModel):
     time_horizon: Optional[str] = None
 
 class StockAnalysisRequest(BaseModel):
-    ticker: str
+    ticker: str = Field(pattern=TICKER_PATTERN)
+    prediction_days: int = Field(default=30, ge=7, le=30)
+    model_type: str = Field(default="xgboost", pattern="^(lstm|xgboost)$")
+    forecast_mode: str = Field(default="recursive", pattern="^(recursive|direct)$")
+    async_mode: bool = False
+
+class BatchAnalysisRequest(BaseModel):
+    tickers: List[Annotated[str, Field(pattern=TICKER_PATTERN)]] = Field(min_length=1, max_length=500)
     prediction_days: int = Field(default=30, ge=7, le=30)
     model_type: str = Field(default="xgboost", pattern="^(lstm|xgboost)$")
+    forecast_mode: str = Field(default="recursive", pattern="^(recursive|direct)$")
 
 class StockAnalysisResponse(BaseModel):
     stock: Stock
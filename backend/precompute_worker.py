@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from database import get_repository
+from executors import run_io, shutdown_executors
+from jobs import get_job_queue
+from write_behind import get_write_queue
+from market_calendar import MARKETS, last_session_date, next_close
+from analysis_pipeline import run_analysis, save_snapshot
+
+class PrecomputeWorker:
+    def __init__(self, concurrency: Optional[int] = None):
+        self.repository = get_repository()
+        self.concurrency = concurrency or settings.PRECOMPUTE_CONCURRENCY
+
+    def watched_tickers(self) -> Dict[str, List[str]]:
+        tickers = {market: set() for market in MARKETS}
+        for stock in self.repository.get_watched_stocks():
+            market = "ID" if stock.get("country") == "ID" else "US"
+            tickers[market].add(stock["ticker"].upper())
+
+        return {market: sorted(names) for market, names in tickers.items()}
+
+    async def run_market(self, market: str, tickers: Optional[List[str]] = None) -> Dict:
+        if tickers is None:
+            tickers = (await run_io(self.watched_tickers))[market]
+
+        started = datetime.now()
+        report = {
+            "market": market,
+            "session_date": last_session_date(market).isoformat(),
+            "stocks": len(tickers),
+            "completed": 0,
+            "failed": 0,
+            "errors": {}
+        }
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def precompute(ticker: str):
+            async with limit:
+                for model_type in settings.PRECOMPUTE_MODEL_TYPES:
+                    for prediction_days in settings.PRECOMPUTE_PREDICTION_DAYS:
+                        try:
+                            result = await run_analysis(
+                                ticker, model_type, prediction_days,
+                                settings.PRECOMPUTE_FORECAST_MODE, in_background=True
+                            )
+                            save_snapshot(ticker, model_type, prediction_days, settings.PRECOMPUTE_FORECAST_MODE, result)
+                            report["completed"] += 1
+                        except Exception as e:
+                            report["failed"] += 1
+                            report["errors"][f"{ticker}/{model_type}/{prediction_days}"] = getattr(e, "detail", str(e))
+
+        await asyncio.gather(*(precompute(ticker) for ticker in tickers))
+
+        # Snapshots must be stored before the next run is scheduled
+        await run_io(get_write_queue().flush)
+
+        report["duration_seconds"] = (datetime.now() - started).total_seconds()
+        return report
+
+    def next_run(self, markets: List[str], now: Optional[datetime] = None) -> Tuple[datetime, str]:
+        now = now or datetime.now(timezone.utc)
+        delay = timedelta(minutes=settings.PRECOMPUTE_DELAY_MINUTES)
+
+        runs = []
+        for market in markets:
+            session = MARKETS[market]
+            last_close = datetime.combine(last_session_date(market, now), session["close"], tzinfo=session["timezone"])
+            run_at = last_close + delay if last_close + delay > now else next_close(market, now) + delay
+            runs.append((run_at, market))
+
+        return min(runs)
+
+    async def run_forever(self, markets: List[str]):
+        while True:
+            run_at, market = self.next_run(markets)
+            print(f"Next precompute run: {market} at {run_at.isoformat()}")
+            await asyncio.sleep(max(0.0, (run_at - datetime.now(timezone.utc)).total_seconds()))
+            _print_report(await self.run_market(market))
+
+    async def run_once(self, markets: List[str]):
+        watched = await run_io(self.watched_tickers)
+        for market in markets:
+            _print_report(await self.run_market(market, watched[market]))
+
+def _print_report(report: Dict):
+    print(
+        f"Precomputed {report['market']} session {report['session_date']}: "
+        f"{report['completed']} completed, {report['failed']} failed "
+        f"across {report['stocks']} stocks in {report['duration_seconds']:.1f}s"
+    )
+    for key, error in report["errors"].items():
+        print(f"  {key}: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute analyses for watched stocks after each market close")
+    parser.add_argument("--market", choices=sorted(MARKETS), help="Only precompute this market")
+    parser.add_argument("--once", action="store_true", help="Run immediately and exit instead of waiting for the close")
+    args = parser.parse_args()
+
+    markets = [args.market] if args.market else list(MARKETS)
+    worker = PrecomputeWorker()
+
+    try:
+        if args.once:
+            asyncio.run(worker.run_once(markets))
+        else:
+            asyncio.run(worker.run_forever(markets))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        get_job_queue().shutdown()
+        shutdown_executors()
+        get_write_queue().shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from tickers import ticker_path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FIELDS = {
+    "date": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+    "adjusted_close": np.float64,
+}
+
+# One raw array file per OHLCV field under TICKER/<generation>/, dates
+# as epoch seconds. Appends only extend the files and write date.bin last, so
+# its length is the committed row count. Revisions of stored bars write a new
+# generation and switch CURRENT atomically; readers keep their old mapping.
+class PriceStore:
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = Path(store_dir or settings.PRICE_STORE_DIR)
+        self._views: Dict[str, Tuple[Tuple[str, int], Dict[str, np.ndarray]]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def columns(self, ticker: str, start: Optional[date] = None) -> Dict[str, np.ndarray]:
+        columns = self._map(ticker.upper())
+        if not columns or start is None:
+            return columns
+
+        first = np.searchsorted(columns["date"], _to_seconds([start])[0])
+        return {field: values[first:] for field, values in columns.items()}
+
+    def frame(self, ticker: str, start: Optional[date] = None) -> pd.DataFrame:
+        columns = self.columns(ticker, start)
+        if not columns:
+            return pd.DataFrame()
+
+        # Read-only views over the mapped files, nothing is parsed or copied
+        data = {field: values for field, values in columns.items()}
+        data["date"] = columns["date"].view("datetime64[s]")
+        return pd.DataFrame(data, copy=False)
+
+    def first_date(self, ticker: str) -> Optional[date]:
+        columns = self._map(ticker.upper())
+        if not columns:
+            return None
+        return pd.Timestamp(columns["date"][0], unit="s").date()
+
+    def last_date(self, ticker: str) -> Optional[date]:
+        columns = self._map(ticker.upper())
+        if not columns:
+            return None
+        return pd.Timestamp(columns["date"][-1], unit="s").date()
+
+    def append(self, ticker: str, records: List[Dict]) -> int:
+        if not records:
+            return 0
+
+        ticker = ticker.upper()
+        incoming = self._to_columns(records)
+
+        with self._lock(ticker):
+            current = self._map(ticker)
+            count = len(current["date"]) if current else 0
+
+            if count:
+                overlapping = incoming["date"] <= current["date"][-1]
+                if overlapping.any():
+                    if not self._matches_stored(current, incoming, overlapping):
+                        self._rewrite(ticker, current, incoming)
+                        return len(incoming["date"])
+                    incoming = {field: values[~overlapping] for field, values in incoming.items()}
+
+            if not len(incoming["date"]):
+                return 0
+
+            self._extend(ticker, incoming, count)
+            return len(incoming["date"])
+
+    def invalidate(self, ticker: str):
+        ticker = ticker.upper()
+        with self._lock(ticker):
+            self._views.pop(ticker, None)
+            shutil.rmtree(self._ticker_dir(ticker), ignore_errors=True)
+
+    def _map(self, ticker: str) -> Dict[str, np.ndarray]:
+        generation = self._current_generation(ticker)
+        if generation is None:
+            return {}
+
+        path = self._ticker_dir(ticker) / generation
+        try:
+            count = (path / "date.bin").stat().st_size // 8
+        except FileNotFoundError:
+            return {}
+
+        signature = (generation, count)
+        cached = self._views.get(ticker)
+        if cached and cached[0] == signature:
+            return cached[1]
+        if not count:
+            return {}
+
+        columns = {
+            field: np.memmap(path / f"{field}.bin", dtype=dtype, mode="r", shape=(count,)).view(np.ndarray)
+            for field, dtype in FIELDS.items()
+        }
+        self._views[ticker] = (signature, columns)
+        return columns
+
+    def _matches_stored(self, current: Dict[str, np.ndarray], incoming: Dict[str, np.ndarray], overlapping: np.ndarray) -> bool:
+        # Re-fetched bars are usually unchanged, those need no write at all
+        dates = incoming["date"][overlapping]
+        positions = np.searchsorted(current["date"], dates)
+        positions = np.minimum(positions, len(current["date"]) - 1)
+
+        same = current["date"][positions] == dates
+        for field in FIELDS:
+            if field != "date":
+                same &= current[field][positions] == incoming[field][overlapping]
+        return bool(same.all())
+
+    def _extend(self, ticker: str, incoming: Dict[str, np.ndarray], count: int):
+        generation = self._current_generation(ticker)
+        if generation is None:
+            self._write_generation(ticker, incoming)
+            return
+
+        path = self._ticker_dir(ticker) / generation
+        for field in [f for f in FIELDS if f != "date"] + ["date"]:
+            file_path = path / f"{field}.bin"
+            # Drop rows left over by an append that never committed its dates
+            with open(file_path, "r+b") as f:
+                f.truncate(count * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(incoming[field], dtype=FIELDS[field]).tobytes())
+
+    def _rewrite(self, ticker: str, current: Dict[str, np.ndarray], incoming: Dict[str, np.ndarray]):
+        merged = pd.concat([pd.DataFrame(current), pd.DataFrame(incoming)], ignore_index=True)
+        merged = merged.drop_duplicates("date", keep="last").sort_values("date")
+        self._write_generation(ticker, {field: merged[field].to_numpy(dtype=dtype) for field, dtype in FIELDS.items()})
+
+    def _write_generation(self, ticker: str, columns: Dict[str, np.ndarray]):
+        ticker_dir = self._ticker_dir(ticker)
+        previous = self._current_generation(ticker)
+        generation = uuid.uuid4().hex
+        path = ticker_dir / generation
+        path.mkdir(parents=True, exist_ok=True)
+
+        for field, dtype in FIELDS.items():
+            with open(path / f"{field}.bin", "wb") as f:
+                f.write(np.asarray(columns[field], dtype=dtype).tobytes())
+
+        tmp_pointer = ticker_dir / f"CURRENT.{generation}"
+        tmp_pointer.write_text(generation)
+        os.replace(tmp_pointer, ticker_dir / "CURRENT")
+
+        if previous:
+            shutil.rmtree(ticker_dir / previous, ignore_errors=True)
+
+    def _current_generation(self, ticker: str) -> Optional[str]:
+        try:
+            return (self._ticker_dir(ticker) / "CURRENT").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _to_columns(self, records: List[Dict]) -> Dict[str, np.ndarray]:
+        df = pd.DataFrame(records)
+        if "adjusted_close" in df:
+            df["adjusted_close"] = df["adjusted_close"].fillna(df["close"])
+        else:
+            df["adjusted_close"] = df["close"]
+
+        df["date"] = _to_seconds(df["date"])
+        df = df.drop_duplicates("date", keep="last").sort_values("date")
+        return {field: df[field].to_numpy(dtype=dtype) for field, dtype in FIELDS.items()}
+
+    def _lock(self, ticker: str) -> "_TickerLock":
+        with self._locks_guard:
+            lock = self._locks.setdefault(ticker, threading.Lock())
+        return _TickerLock(lock, self.store_dir / f"{self._ticker_dir(ticker).name}.lock")
+
+    def _ticker_dir(self, ticker: str) -> Path:
+        # Invalidation removes this directory, it must never resolve outside store_dir
+        return ticker_path(self.store_dir, ticker)
+
+class _TickerLock:
+    # Threads in this process and other processes (API, precompute worker)
+    # share the files, so appends take both locks.
+    def __init__(self, lock: threading.Lock, path: Path):
+        self.lock = lock
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        if fcntl is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.lock.release()
+
+def _to_seconds(dates) -> np.ndarray:
+    return pd.to_datetime(pd.Series(dates)).dt.tz_localize(None).to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+price_store = PriceStore()
+
+def get_price_store() -> PriceStore:
+    return price_store
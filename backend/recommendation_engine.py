@@ -1,11 +1,32 @@
-from typing import Dict, Any
-from database import get_supabase_client
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from write_behind import persist
+from instrumentation import timed
+from screener import get_screener
 from datetime import datetime
+import uuid
+
+FUNDAMENTAL_FIELDS = ["trailingPE", "priceToBook", "returnOnEquity", "debtToEquity", "revenueGrowth"]
+
+@dataclass(frozen=True)
+class Thresholds:
+    strong_move_pct: float = 10.0
+    move_pct: float = 5.0
+    strong_buy_score: float = 0.65
+    buy_score: float = 0.6
+    strong_sell_score: float = 0.35
+    sell_score: float = 0.4
+    short_horizon_pct: float = 15.0
+    medium_horizon_pct: float = 8.0
 
 class RecommendationEngine:
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    def __init__(self, thresholds: Optional[Thresholds] = None):
+        self.thresholds = thresholds or Thresholds()
+        self.screener = get_screener()
 
+    @timed("recommendation")
     def generate_recommendation(
         self,
         stock_id: str,
@@ -22,25 +43,26 @@ class RecommendationEngine:
 
         combined_score = (technical_score * 0.4) + (fundamental_score * 0.3) + (prediction_confidence * 0.3)
 
-        if price_change_pct > 10 and combined_score > 0.65:
+        t = self.thresholds
+        if price_change_pct > t.strong_move_pct and combined_score > t.strong_buy_score:
             action = "buy"
             risk_level = "medium"
-        elif price_change_pct < -10 and combined_score < 0.35:
+        elif price_change_pct < -t.strong_move_pct and combined_score < t.strong_sell_score:
             action = "sell"
             risk_level = "high"
-        elif price_change_pct > 5 and combined_score > 0.6:
+        elif price_change_pct > t.move_pct and combined_score > t.buy_score:
             action = "buy"
             risk_level = "low"
-        elif price_change_pct < -5 and combined_score < 0.4:
+        elif price_change_pct < -t.move_pct and combined_score < t.sell_score:
             action = "sell"
             risk_level = "medium"
         else:
             action = "hold"
             risk_level = "low"
 
-        if abs(price_change_pct) > 15:
+        if abs(price_change_pct) > t.short_horizon_pct:
             time_horizon = "short"
-        elif abs(price_change_pct) > 8:
+        elif abs(price_change_pct) > t.medium_horizon_pct:
             time_horizon = "medium"
         else:
             time_horizon = "long"
@@ -71,6 +93,72 @@ class RecommendationEngine:
 
         return recommendation
 
+    def generate_recommendations_batch(self, stocks: pd.DataFrame, thresholds: Optional[Thresholds] = None) -> pd.DataFrame:
+        # One row per stock: current_price, predicted_price, prediction_confidence,
+        # technical_score and either fundamental_score or the FUNDAMENTAL_FIELDS
+        # ratios (NaN where unknown). Same rules as generate_recommendation,
+        # without the reasoning text.
+        t = thresholds or self.thresholds
+        current_price = stocks["current_price"].to_numpy(dtype=np.float64)
+        predicted_price = stocks["predicted_price"].to_numpy(dtype=np.float64)
+        technical_score = stocks["technical_score"].to_numpy(dtype=np.float64)
+
+        if "fundamental_score" in stocks:
+            fundamental_score = stocks["fundamental_score"].to_numpy(dtype=np.float64)
+        elif any(field in stocks for field in FUNDAMENTAL_FIELDS):
+            fundamental_score = self.calculate_fundamental_scores(stocks)
+        else:
+            fundamental_score = np.full(len(stocks), 0.5)
+
+        price_change_pct = ((predicted_price - current_price) / current_price) * 100
+        combined_score = (technical_score * 0.4) + (fundamental_score * 0.3) + (stocks["prediction_confidence"].to_numpy(dtype=np.float64) * 0.3)
+
+        rules = [
+            (price_change_pct > t.strong_move_pct) & (combined_score > t.strong_buy_score),
+            (price_change_pct < -t.strong_move_pct) & (combined_score < t.strong_sell_score),
+            (price_change_pct > t.move_pct) & (combined_score > t.buy_score),
+            (price_change_pct < -t.move_pct) & (combined_score < t.sell_score),
+        ]
+        action = np.select(rules, ["buy", "sell", "buy", "sell"], "hold")
+        risk_level = np.select(rules, ["medium", "high", "low", "medium"], "low")
+
+        move = np.abs(price_change_pct)
+        time_horizon = np.select([move > t.short_horizon_pct, move > t.medium_horizon_pct], ["short", "medium"], "long")
+
+        return pd.DataFrame({
+            "action": action,
+            "confidence_score": combined_score,
+            "target_price": np.where(action == "sell", current_price * 0.95, predicted_price),
+            "current_price": current_price,
+            "price_change_pct": price_change_pct,
+            "technical_score": technical_score,
+            "fundamental_score": fundamental_score,
+            "risk_level": risk_level,
+            "time_horizon": time_horizon
+        }, index=stocks.index)
+
+    def calculate_fundamental_scores(self, fundamentals: pd.DataFrame) -> np.ndarray:
+        # Vectorized _calculate_fundamental_score over FUNDAMENTAL_FIELDS columns;
+        # like the falsy checks there, NaN and zero ratios are skipped
+        def ratio(field: str) -> np.ndarray:
+            if field not in fundamentals:
+                return np.full(len(fundamentals), np.nan)
+            values = fundamentals[field].to_numpy(dtype=np.float64)
+            return np.where(values == 0, np.nan, values)
+
+        score = np.full(len(fundamentals), 0.5)
+        for field, low, low_delta, high, high_delta in [
+            ("trailingPE", 15, 0.1, 30, -0.1),
+            ("priceToBook", 1.5, 0.1, 3, -0.05),
+            ("returnOnEquity", 0.05, -0.1, 0.15, 0.15),
+            ("debtToEquity", 0.5, 0.1, 2, -0.15),
+            ("revenueGrowth", 0, -0.1, 0.15, 0.1),
+        ]:
+            values = ratio(field)
+            score += np.select([values < low, values > high], [low_delta, high_delta], 0.0)
+
+        return np.clip(score, 0.0, 1.0)
+
     def _calculate_fundamental_score(self, financial_data: Dict) -> float:
         if not financial_data or "info" not in financial_data:
             return 0.5
@@ -184,6 +272,18 @@ class RecommendationEngine:
 
         return "".join(reasoning_parts)
 
+    @timed("save_recommendation")
     def save_recommendation(self, recommendation: Dict) -> Dict:
-        result = self.supabase.table("recommendations").insert(recommendation).execute()
-        return result.data[0] if result.data else None
+        now = datetime.now()
+        record = {
+            "id": str(uuid.uuid4()),
+            "recommendation_date": now.strftime("%Y-%m-%d"),
+            **recommendation
+        }
+
+        report = persist("recommendations", [record])
+        if report["failed"]:
+            return None
+
+        self.screener.update_recommendation(record)
+        return {**record, "created_at": now.isoformat()}
@@ -0,0 +1,246 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+PAGE_SIZE = 1000
+
+# Every read and write the services make, so the same pipeline can run
+# against Supabase or the embedded SQLite database.
+class StorageRepository(ABC):
+    @abstractmethod
+    def get_stock_by_ticker(self, ticker: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def search_stocks(self, query: str, limit: int = 10) -> List[Dict]: ...
+
+    @abstractmethod
+    def list_stocks(self) -> List[Dict]: ...
+
+    @abstractmethod
+    def list_latest_indicators(self) -> List[Dict]: ...
+
+    @abstractmethod
+    def list_latest_recommendations(self) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_prices(self, stock_id: str, start_date: str) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_latest_price(self, stock_id: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def get_latest_price_date(self, stock_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def get_indicators(self, stock_id: str, limit: int) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_latest_indicator_date(self, stock_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def get_financial_statements(self, stock_id: str) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_latest_prediction_run(self, stock_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def get_predictions(self, stock_id: str, limit: int, run_id: Optional[str] = None) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_recommendations(self, stock_id: str, limit: int) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_watched_stocks(self) -> List[Dict]: ...
+
+    @abstractmethod
+    def get_analysis_snapshot(self, ticker: str, model_type: str, prediction_days: int, forecast_mode: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def insert(self, table: str, records: List[Dict]) -> List[Dict]: ...
+
+    @abstractmethod
+    def upsert(self, table: str, records: List[Dict], on_conflict: str) -> None: ...
+
+class SupabaseRepository(StorageRepository):
+    def __init__(self, client):
+        self.client = client
+
+    def get_stock_by_ticker(self, ticker: str) -> Optional[Dict]:
+        result = self.client.table("stocks")\
+            .select("*")\
+            .eq("ticker", ticker)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0] if result.data else None
+
+    def search_stocks(self, query: str, limit: int = 10) -> List[Dict]:
+        result = self.client.table("stocks")\
+            .select("*")\
+            .ilike("ticker", f"%{query}%")\
+            .limit(limit)\
+            .execute()
+
+        return result.data if result.data else []
+
+    def list_stocks(self) -> List[Dict]:
+        return self._select_all("stocks", "ticker")
+
+    def list_latest_indicators(self) -> List[Dict]:
+        return self._select_all("latest_technical_indicators", "stock_id")
+
+    def list_latest_recommendations(self) -> List[Dict]:
+        return self._select_all("latest_recommendations", "stock_id")
+
+    def _select_all(self, table: str, order_by: str) -> List[Dict]:
+        rows = []
+
+        offset = 0
+        while True:
+            result = self.client.table(table)\
+                .select("*")\
+                .order(order_by, desc=False)\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+
+            page = result.data or []
+            rows.extend(page)
+
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+        return rows
+
+    def get_prices(self, stock_id: str, start_date: str) -> List[Dict]:
+        result = self.client.table("stock_prices")\
+            .select("*")\
+            .eq("stock_id", stock_id)\
+            .gte("date", start_date)\
+            .order("date", desc=False)\
+            .execute()
+
+        return result.data if result.data else []
+
+    def get_latest_price(self, stock_id: str) -> Optional[Dict]:
+        result = self.client.table("stock_prices")\
+            .select("*")\
+            .eq("stock_id", stock_id)\
+            .order("date", desc=True)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0] if result.data else None
+
+    def get_latest_price_date(self, stock_id: str) -> Optional[str]:
+        result = self.client.table("stock_prices")\
+            .select("date")\
+            .eq("stock_id", stock_id)\
+            .order("date", desc=True)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0]["date"] if result.data else None
+
+    def get_indicators(self, stock_id: str, limit: int) -> List[Dict]:
+        result = self.client.table("technical_indicators")\
+            .select("*")\
+            .eq("stock_id", stock_id)\
+            .order("date", desc=True)\
+            .limit(limit)\
+            .execute()
+
+        return result.data if result.data else []
+
+    def get_latest_indicator_date(self, stock_id: str) -> Optional[str]:
+        result = self.client.table("technical_indicators")\
+            .select("date")\
+            .eq("stock_id", stock_id)\
+            .order("date", desc=True)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0]["date"] if result.data else None
+
+    def get_financial_statements(self, stock_id: str) -> List[Dict]:
+        result = self.client.table("financial_statements")\
+            .select("period_end, statement_type, data")\
+            .eq("stock_id", stock_id)\
+            .order("period_end", desc=True)\
+            .execute()
+
+        return result.data if result.data else []
+
+    def get_latest_prediction_run(self, stock_id: str) -> Optional[str]:
+        # Newest run via idx_predictions_stock_date
+        result = self.client.table("predictions")\
+            .select("run_id")\
+            .eq("stock_id", stock_id)\
+            .order("prediction_date", desc=True)\
+            .order("created_at", desc=True)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0]["run_id"] if result.data else None
+
+    def get_predictions(self, stock_id: str, limit: int, run_id: Optional[str] = None) -> List[Dict]:
+        query = self.client.table("predictions")\
+            .select("*")\
+            .eq("stock_id", stock_id)
+
+        if run_id:
+            query = query.eq("run_id", run_id).order("target_date", desc=False)
+        else:
+            query = query.order("prediction_date", desc=True)
+
+        result = query.limit(limit).execute()
+        return result.data if result.data else []
+
+    def get_recommendations(self, stock_id: str, limit: int) -> List[Dict]:
+        result = self.client.table("recommendations")\
+            .select("*")\
+            .eq("stock_id", stock_id)\
+            .order("recommendation_date", desc=True)\
+            .limit(limit)\
+            .execute()
+
+        return result.data if result.data else []
+
+    def get_watched_stocks(self) -> List[Dict]:
+        stocks = {}
+
+        offset = 0
+        while True:
+            result = self.client.table("user_watchlist")\
+                .select("stock_id, stocks(ticker, country)")\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+
+            rows = result.data or []
+            for row in rows:
+                if row.get("stocks"):
+                    stocks[row["stock_id"]] = row["stocks"]
+
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+        return list(stocks.values())
+
+    def get_analysis_snapshot(self, ticker: str, model_type: str, prediction_days: int, forecast_mode: str) -> Optional[Dict]:
+        result = self.client.table("analysis_snapshots")\
+            .select("session_date, payload")\
+            .eq("ticker", ticker)\
+            .eq("model_type", model_type)\
+            .eq("prediction_days", prediction_days)\
+            .eq("forecast_mode", forecast_mode)\
+            .limit(1)\
+            .execute()
+
+        return result.data[0] if result.data else None
+
+    def insert(self, table: str, records: List[Dict]) -> List[Dict]:
+        result = self.client.table(table).insert(records).execute()
+        return result.data if result.data else []
+
+    def upsert(self, table: str, records: List[Dict], on_conflict: str) -> None:
+        self.client.table(table).upsert(records, on_conflict=on_conflict).execute()
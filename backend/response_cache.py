@@ -0,0 +1,66 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from config import settings
+
+class ResponseCache:
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.RESPONSE_CACHE_TTL
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.metrics = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return value, "HIT"
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.metrics["coalesced"] += 1
+            return await asyncio.shield(inflight), "COALESCED"
+
+        self.metrics["misses"] += 1
+        # The computation is a task of its own and every caller, the first
+        # one included, only waits on it through shield: a disconnecting
+        # client cancels its own wait, never the work the others share
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), "MISS"
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict:
+        return {**self.metrics, "entries": len(self._entries), "inflight": len(self._inflight)}
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        # Also marks the exception retrieved when nobody is left waiting
+        if task.exception() is None:
+            self._store(key, task.result())
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (time.time() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+response_cache = ResponseCache()
+
+def get_response_cache() -> ResponseCache:
+    return response_cache
@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+STOCK_FIELDS = ("ticker", "name", "exchange", "sector", "country", "currency")
+INDICATOR_FIELDS = ("close", "rsi_14", "macd", "macd_signal", "sma_50", "sma_200", "previous_macd", "previous_macd_signal")
+RECOMMENDATION_FIELDS = (
+    "action", "confidence_score", "target_price", "current_price", "technical_score",
+    "fundamental_score", "risk_level", "time_horizon", "recommendation_date"
+)
+SORT_FIELDS = (
+    "ticker", "close", "rsi_14", "confidence_score", "technical_score",
+    "fundamental_score", "upside_pct", "indicator_date", "recommendation_date"
+)
+MACD_SIGNALS = ("bullish_crossover", "bearish_crossover", "above_signal", "below_signal")
+
+# Latest indicators and recommendation per stock, kept in memory so the
+# screener filters a few thousand rows instead of querying the history
+# tables. Writes from this process update it as they happen; a periodic
+# reload from the latest_* views picks up writes from other workers.
+class ScreenerSnapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict] = {}
+        self._updated: Dict[str, Tuple[float, Set[str]]] = {}
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+
+    def load(self, stocks: Iterable[Dict], indicators: Iterable[Dict], recommendations: Iterable[Dict], started_at: float):
+        rows = {stock["id"]: _row(stock["id"], stock, STOCK_FIELDS) for stock in stocks}
+        for indicator in indicators:
+            stock_id = indicator["stock_id"]
+            rows[stock_id] = _with_indicators(rows.get(stock_id) or _row(stock_id), indicator)
+        for recommendation in recommendations:
+            stock_id = recommendation["stock_id"]
+            rows[stock_id] = _with_recommendation(rows.get(stock_id) or _row(stock_id), recommendation)
+
+        with self._lock:
+            # Fields written here while the tables were being read are newer
+            # than what was read. Only those fields are kept: the rest of a
+            # row created locally before the first load is empty
+            for stock_id, (updated, fields) in self._updated.items():
+                if updated >= started_at and stock_id in self._rows:
+                    local = self._rows[stock_id]
+                    row = {**(rows.get(stock_id) or _row(stock_id)), **{field: local[field] for field in fields}}
+                    rows[stock_id] = {**row, **_derived(row)}
+            self._rows = rows
+            self._updated = {}
+            self.loaded_at = started_at
+            self.failed_at = None
+
+    def add_stock(self, stock: Dict):
+        self._update(stock["id"], lambda row: {**row, **{field: stock.get(field) for field in STOCK_FIELDS}}, STOCK_FIELDS)
+
+    def update_indicators(self, indicators: Dict):
+        self._update(indicators["stock_id"], lambda row: _with_indicators(row, indicators), INDICATOR_FIELDS + ("indicator_date",))
+
+    def update_recommendation(self, recommendation: Dict):
+        self._update(recommendation["stock_id"], lambda row: _with_recommendation(row, recommendation), RECOMMENDATION_FIELDS + ("upside_pct",))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def query(
+        self,
+        rsi_min: Optional[float] = None,
+        rsi_max: Optional[float] = None,
+        sma_50: Optional[str] = None,
+        sma_200: Optional[str] = None,
+        macd: Optional[str] = None,
+        actions: Optional[List[str]] = None,
+        min_confidence: Optional[float] = None,
+        sector: Optional[str] = None,
+        country: Optional[str] = None,
+        sort_by: str = "ticker",
+        descending: bool = False,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict:
+        # Rows are replaced rather than changed in place, so the list can be
+        # filtered and returned after the lock is released
+        with self._lock:
+            rows = list(self._rows.values())
+
+        checks = []
+        if rsi_min is not None:
+            checks.append(lambda row: row["rsi_14"] is not None and row["rsi_14"] >= rsi_min)
+        if rsi_max is not None:
+            checks.append(lambda row: row["rsi_14"] is not None and row["rsi_14"] <= rsi_max)
+        if sma_50:
+            checks.append(lambda row: row["price_vs_sma_50"] == sma_50)
+        if sma_200:
+            checks.append(lambda row: row["price_vs_sma_200"] == sma_200)
+        if macd in ("bullish_crossover", "bearish_crossover"):
+            crossover = macd.split("_")[0]
+            checks.append(lambda row: row["macd_crossover"] == crossover)
+        elif macd:
+            side = macd.split("_")[0]
+            checks.append(lambda row: row["macd_vs_signal"] == side)
+        if actions:
+            checks.append(lambda row: row["action"] in actions)
+        if min_confidence is not None:
+            checks.append(lambda row: row["confidence_score"] is not None and row["confidence_score"] >= min_confidence)
+        if sector:
+            sector = sector.lower()
+            checks.append(lambda row: (row["sector"] or "").lower() == sector)
+        if country:
+            country = country.upper()
+            checks.append(lambda row: (row["country"] or "").upper() == country)
+
+        matches = [row for row in rows if all(check(row) for check in checks)]
+
+        # Stocks without a value for the sort field go last either way
+        present = [row for row in matches if row[sort_by] is not None]
+        missing = [row for row in matches if row[sort_by] is None]
+        present.sort(key=lambda row: (row[sort_by], row["ticker"] or ""), reverse=descending)
+        ranked = present + sorted(missing, key=lambda row: row["ticker"] or "")
+
+        return {
+            "total": len(ranked),
+            "limit": limit,
+            "offset": offset,
+            "as_of": self.loaded_at,
+            "results": ranked[offset:offset + limit]
+        }
+
+    def _update(self, stock_id: str, change, fields: Tuple[str, ...]):
+        with self._lock:
+            self._rows[stock_id] = change(self._rows.get(stock_id) or _row(stock_id))
+            _, written = self._updated.get(stock_id, (None, set()))
+            self._updated[stock_id] = (time.time(), written | set(fields))
+
+def _row(stock_id: str, values: Optional[Dict] = None, fields: Iterable[str] = ()) -> Dict:
+    row = {"stock_id": stock_id}
+    for field in STOCK_FIELDS + INDICATOR_FIELDS + RECOMMENDATION_FIELDS:
+        row[field] = None
+    row.update({"indicator_date": None, "upside_pct": None})
+    row.update(_derived(row))
+    if values:
+        row.update({field: values.get(field) for field in fields})
+    return row
+
+def _with_indicators(row: Dict, indicators: Dict) -> Dict:
+    # An older row arriving late (a reload racing a write) does not overwrite a newer one
+    if row["indicator_date"] and indicators.get("date") and str(indicators["date"]) < row["indicator_date"]:
+        return row
+    row = {**row, **{field: indicators.get(field) for field in INDICATOR_FIELDS}}
+    row["indicator_date"] = str(indicators["date"]) if indicators.get("date") else None
+    return {**row, **_derived(row)}
+
+def _with_recommendation(row: Dict, recommendation: Dict) -> Dict:
+    if row["recommendation_date"] and recommendation.get("recommendation_date") and str(recommendation["recommendation_date"]) < row["recommendation_date"]:
+        return row
+    row = {**row, **{field: recommendation.get(field) for field in RECOMMENDATION_FIELDS}}
+    if row["recommendation_date"]:
+        row["recommendation_date"] = str(row["recommendation_date"])
+    target, current = row["target_price"], row["current_price"]
+    row["upside_pct"] = (target - current) / current * 100 if target is not None and current else None
+    return row
+
+def _derived(row: Dict) -> Dict:
+    close, macd, signal = row["close"], row["macd"], row["macd_signal"]
+    previous_macd, previous_signal = row["previous_macd"], row["previous_macd_signal"]
+
+    crossover = None
+    if None not in (macd, signal, previous_macd, previous_signal):
+        if macd > signal and previous_macd <= previous_signal:
+            crossover = "bullish"
+        elif macd < signal and previous_macd >= previous_signal:
+            crossover = "bearish"
+
+    return {
+        "price_vs_sma_50": _side(close, row["sma_50"]),
+        "price_vs_sma_200": _side(close, row["sma_200"]),
+        "macd_vs_signal": _side(macd, signal),
+        "macd_crossover": crossover
+    }
+
+def _side(value: Optional[float], reference: Optional[float]) -> Optional[str]:
+    if value is None or reference is None:
+        return None
+    return "above" if value > reference else "below"
+
+screener = ScreenerSnapshot()
+
+def get_screener() -> ScreenerSnapshot:
+    return screener
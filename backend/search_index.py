@@ -0,0 +1,166 @@
+import heapq
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+FUZZY_MIN_SIMILARITY = 0.5
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.ids: Set[str] = set()
+
+class _Trie:
+    # Every node keeps the ids of all keys below it, so a prefix lookup is
+    # one walk down the query with no subtree traversal
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, key: str, stock_id: str):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            node.ids.add(stock_id)
+
+    def remove(self, key: str, stock_id: str):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return
+            node.ids.discard(stock_id)
+
+    def prefixed(self, prefix: str) -> Set[str]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+class StockSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stocks: Dict[str, Dict] = {}
+        self._keys: Dict[str, Tuple[str, str, List[str]]] = {}
+        self._order: Dict[str, Tuple[int, str]] = {}
+        self._by_ticker: Dict[str, str] = {}
+        self._tickers = _Trie()
+        self._words = _Trie()
+        self._trigrams: Dict[str, Set[str]] = {}
+        self.loaded_at: Optional[float] = None
+
+    def load(self, stocks: Iterable[Dict]):
+        with self._lock:
+            for stock in stocks:
+                self._add(stock)
+            self.loaded_at = time.time()
+
+    def add(self, stock: Dict):
+        with self._lock:
+            self._add(stock)
+
+    def __len__(self) -> int:
+        return len(self._stocks)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        ticker_query = query.strip().upper()
+        words = _words(query)
+        if not ticker_query:
+            return []
+
+        with self._lock:
+            results: List[str] = []
+            seen: Set[str] = set()
+
+            # Tiers are filled best first, later tiers are only searched
+            # while there is room left
+            def take(ids: Iterable[str], key: Callable = self._order.__getitem__):
+                needed = limit - len(results)
+                if needed <= 0:
+                    return
+                for stock_id in heapq.nsmallest(needed, [i for i in ids if i not in seen], key=key):
+                    results.append(stock_id)
+                    seen.add(stock_id)
+
+            if ticker_query in self._by_ticker:
+                take([self._by_ticker[ticker_query]])
+            take(self._tickers.prefixed(ticker_query))
+
+            # "bank central" matches names with a word starting with each term
+            if words and len(results) < limit:
+                matches = self._words.prefixed(words[0])
+                for word in words[1:]:
+                    matches = matches & self._words.prefixed(word)
+                take(matches)
+
+            text = " ".join(words)
+            grams = _trigrams(text)
+            if len(results) < limit and grams:
+                shared: Dict[str, int] = {}
+                for gram in grams:
+                    for stock_id in self._trigrams.get(gram, ()):
+                        shared[stock_id] = shared.get(stock_id, 0) + 1
+
+                contains = []
+                similarity: Dict[str, float] = {}
+                for stock_id, count in shared.items():
+                    ticker, name, _ = self._keys[stock_id]
+                    if text in ticker.lower() or text in name:
+                        contains.append(stock_id)
+                    elif count / len(grams) >= FUZZY_MIN_SIMILARITY:
+                        # Tolerates typos such as "microsfot"
+                        similarity[stock_id] = count / len(grams)
+
+                take(contains)
+                take(similarity, key=lambda stock_id: (-similarity[stock_id], self._order[stock_id]))
+
+            return [self._stocks[stock_id] for stock_id in results]
+
+    def _add(self, stock: Dict):
+        stock_id = stock["id"]
+        if stock_id in self._keys:
+            self._remove(stock_id)
+
+        ticker = stock["ticker"].upper()
+        name = " ".join(_words(stock.get("name") or ""))
+        # Ticker parts count as words, so BBCA finds BBCA.JK by name as well
+        words = sorted(set(_words(ticker) + name.split()))
+
+        self._stocks[stock_id] = stock
+        self._keys[stock_id] = (ticker, name, words)
+        # Within a tier shorter tickers come first: "AA" before "AAPL"
+        self._order[stock_id] = (len(ticker), ticker)
+        self._by_ticker[ticker] = stock_id
+        self._tickers.add(ticker, stock_id)
+        for word in words:
+            self._words.add(word, stock_id)
+        for gram in _trigrams(ticker.lower()) | _trigrams(name):
+            self._trigrams.setdefault(gram, set()).add(stock_id)
+
+    def _remove(self, stock_id: str):
+        ticker, name, words = self._keys.pop(stock_id)
+        self._stocks.pop(stock_id, None)
+        self._order.pop(stock_id, None)
+        if self._by_ticker.get(ticker) == stock_id:
+            del self._by_ticker[ticker]
+        self._tickers.remove(ticker, stock_id)
+        for word in words:
+            self._words.remove(word, stock_id)
+        for gram in _trigrams(ticker.lower()) | _trigrams(name):
+            self._trigrams.get(gram, set()).discard(stock_id)
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if text else set()
+
+search_index = StockSearchIndex()
+
+def get_search_index() -> StockSearchIndex:
+    return search_index
@@ -0,0 +1,331 @@
+import json
+import sqlite3
+import threading
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+from repository import StorageRepository
+
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.float32, float)
+sqlite3.register_adapter(np.bool_, bool)
+
+NOW = "(strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+
+# Same tables as supabase/migrations, in SQLite types. Dates are ISO text so
+# they compare and sort like the Postgres columns.
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS stocks (
+  id TEXT PRIMARY KEY,
+  ticker TEXT UNIQUE NOT NULL,
+  name TEXT NOT NULL,
+  exchange TEXT NOT NULL,
+  sector TEXT,
+  country TEXT NOT NULL DEFAULT 'US',
+  currency TEXT NOT NULL DEFAULT 'USD',
+  last_updated TEXT DEFAULT {NOW},
+  created_at TEXT DEFAULT {NOW}
+);
+
+CREATE TABLE IF NOT EXISTS stock_prices (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  date TEXT NOT NULL,
+  open REAL NOT NULL,
+  high REAL NOT NULL,
+  low REAL NOT NULL,
+  close REAL NOT NULL,
+  volume INTEGER NOT NULL,
+  adjusted_close REAL,
+  created_at TEXT DEFAULT {NOW},
+  UNIQUE(stock_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS technical_indicators (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  date TEXT NOT NULL,
+  rsi_14 REAL,
+  macd REAL,
+  macd_signal REAL,
+  macd_histogram REAL,
+  sma_20 REAL,
+  sma_50 REAL,
+  sma_200 REAL,
+  ema_12 REAL,
+  ema_26 REAL,
+  created_at TEXT DEFAULT {NOW},
+  UNIQUE(stock_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS financial_statements (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  period_end TEXT NOT NULL,
+  statement_type TEXT NOT NULL CHECK (statement_type IN ('income_statement', 'balance_sheet', 'cash_flow')),
+  data TEXT NOT NULL,
+  created_at TEXT DEFAULT {NOW},
+  UNIQUE(stock_id, period_end, statement_type)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  run_id TEXT,
+  prediction_date TEXT NOT NULL DEFAULT (date('now')),
+  target_date TEXT NOT NULL,
+  predicted_price REAL NOT NULL,
+  actual_price REAL,
+  model_type TEXT NOT NULL CHECK (model_type IN ('lstm', 'xgboost')),
+  confidence_score REAL CHECK (confidence_score >= 0 AND confidence_score <= 1),
+  prediction_horizon INTEGER NOT NULL,
+  features_used TEXT,
+  created_at TEXT DEFAULT {NOW}
+);
+
+CREATE TABLE IF NOT EXISTS recommendations (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  recommendation_date TEXT NOT NULL DEFAULT (date('now')),
+  action TEXT NOT NULL CHECK (action IN ('buy', 'hold', 'sell')),
+  confidence_score REAL CHECK (confidence_score >= 0 AND confidence_score <= 1),
+  target_price REAL,
+  current_price REAL NOT NULL,
+  technical_score REAL,
+  fundamental_score REAL,
+  reasoning TEXT NOT NULL,
+  risk_level TEXT CHECK (risk_level IN ('low', 'medium', 'high')),
+  time_horizon TEXT CHECK (time_horizon IN ('short', 'medium', 'long')),
+  created_at TEXT DEFAULT {NOW}
+);
+
+CREATE TABLE IF NOT EXISTS user_watchlist (
+  id TEXT PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  created_at TEXT DEFAULT {NOW},
+  UNIQUE(user_id, stock_id)
+);
+
+CREATE TABLE IF NOT EXISTS analysis_snapshots (
+  id TEXT PRIMARY KEY,
+  stock_id TEXT NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  ticker TEXT NOT NULL,
+  model_type TEXT NOT NULL,
+  prediction_days INTEGER NOT NULL,
+  forecast_mode TEXT NOT NULL DEFAULT 'recursive',
+  session_date TEXT NOT NULL,
+  payload TEXT NOT NULL,
+  created_at TEXT DEFAULT {NOW},
+  updated_at TEXT DEFAULT {NOW},
+  UNIQUE(ticker, model_type, prediction_days, forecast_mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_prices_stock_date ON stock_prices(stock_id, date DESC);
+CREATE INDEX IF NOT EXISTS idx_technical_indicators_stock_date ON technical_indicators(stock_id, date DESC);
+CREATE INDEX IF NOT EXISTS idx_predictions_stock_date ON predictions(stock_id, prediction_date DESC);
+CREATE INDEX IF NOT EXISTS idx_predictions_stock_run ON predictions(stock_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_recommendations_stock_date ON recommendations(stock_id, recommendation_date DESC);
+CREATE INDEX IF NOT EXISTS idx_financial_statements_stock_period ON financial_statements(stock_id, period_end DESC);
+CREATE INDEX IF NOT EXISTS idx_user_watchlist_stock ON user_watchlist(stock_id);
+
+CREATE VIEW IF NOT EXISTS latest_technical_indicators AS
+SELECT
+  t.stock_id, t.date, t.rsi_14, t.macd, t.macd_signal, t.sma_50, t.sma_200,
+  (SELECT p.close FROM stock_prices p WHERE p.stock_id = t.stock_id AND p.date = t.date) AS close,
+  (SELECT i.macd FROM technical_indicators i WHERE i.stock_id = t.stock_id AND i.date < t.date ORDER BY i.date DESC LIMIT 1) AS previous_macd,
+  (SELECT i.macd_signal FROM technical_indicators i WHERE i.stock_id = t.stock_id AND i.date < t.date ORDER BY i.date DESC LIMIT 1) AS previous_macd_signal
+FROM stocks s
+JOIN technical_indicators t ON t.stock_id = s.id
+  AND t.date = (SELECT MAX(i.date) FROM technical_indicators i WHERE i.stock_id = s.id);
+
+CREATE VIEW IF NOT EXISTS latest_recommendations AS
+SELECT r.*
+FROM stocks s
+JOIN recommendations r ON r.id = (
+  SELECT l.id FROM recommendations l WHERE l.stock_id = s.id
+  ORDER BY l.recommendation_date DESC, l.created_at DESC LIMIT 1
+);
+"""
+
+JSON_COLUMNS = {
+    "financial_statements": ("data",),
+    "predictions": ("features_used",),
+    "analysis_snapshots": ("payload",),
+}
+
+class SQLiteRepository(StorageRepository):
+    def __init__(self, path: str):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        # One connection shared by the worker threads, serialised by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def get_stock_by_ticker(self, ticker: str) -> Optional[Dict]:
+        return self._one("stocks", "SELECT * FROM stocks WHERE ticker = ?", (ticker,))
+
+    def search_stocks(self, query: str, limit: int = 10) -> List[Dict]:
+        return self._all("stocks", "SELECT * FROM stocks WHERE ticker LIKE ? LIMIT ?", (f"%{query}%", limit))
+
+    def list_stocks(self) -> List[Dict]:
+        return self._all("stocks", "SELECT * FROM stocks ORDER BY ticker", ())
+
+    def list_latest_indicators(self) -> List[Dict]:
+        return self._all("technical_indicators", "SELECT * FROM latest_technical_indicators", ())
+
+    def list_latest_recommendations(self) -> List[Dict]:
+        return self._all("recommendations", "SELECT * FROM latest_recommendations", ())
+
+    def get_prices(self, stock_id: str, start_date: str) -> List[Dict]:
+        return self._all(
+            "stock_prices",
+            "SELECT * FROM stock_prices WHERE stock_id = ? AND date >= ? ORDER BY date",
+            (stock_id, start_date)
+        )
+
+    def get_latest_price(self, stock_id: str) -> Optional[Dict]:
+        return self._one(
+            "stock_prices",
+            "SELECT * FROM stock_prices WHERE stock_id = ? ORDER BY date DESC LIMIT 1",
+            (stock_id,)
+        )
+
+    def get_latest_price_date(self, stock_id: str) -> Optional[str]:
+        row = self._one("stock_prices", "SELECT MAX(date) AS date FROM stock_prices WHERE stock_id = ?", (stock_id,))
+        return row["date"] if row else None
+
+    def get_indicators(self, stock_id: str, limit: int) -> List[Dict]:
+        return self._all(
+            "technical_indicators",
+            "SELECT * FROM technical_indicators WHERE stock_id = ? ORDER BY date DESC LIMIT ?",
+            (stock_id, limit)
+        )
+
+    def get_latest_indicator_date(self, stock_id: str) -> Optional[str]:
+        row = self._one("technical_indicators", "SELECT MAX(date) AS date FROM technical_indicators WHERE stock_id = ?", (stock_id,))
+        return row["date"] if row else None
+
+    def get_financial_statements(self, stock_id: str) -> List[Dict]:
+        return self._all(
+            "financial_statements",
+            "SELECT period_end, statement_type, data FROM financial_statements WHERE stock_id = ? ORDER BY period_end DESC",
+            (stock_id,)
+        )
+
+    def get_latest_prediction_run(self, stock_id: str) -> Optional[str]:
+        row = self._one(
+            "predictions",
+            "SELECT run_id FROM predictions WHERE stock_id = ? ORDER BY prediction_date DESC, created_at DESC LIMIT 1",
+            (stock_id,)
+        )
+        return row["run_id"] if row else None
+
+    def get_predictions(self, stock_id: str, limit: int, run_id: Optional[str] = None) -> List[Dict]:
+        if run_id:
+            return self._all(
+                "predictions",
+                "SELECT * FROM predictions WHERE stock_id = ? AND run_id = ? ORDER BY target_date LIMIT ?",
+                (stock_id, run_id, limit)
+            )
+
+        return self._all(
+            "predictions",
+            "SELECT * FROM predictions WHERE stock_id = ? ORDER BY prediction_date DESC LIMIT ?",
+            (stock_id, limit)
+        )
+
+    def get_recommendations(self, stock_id: str, limit: int) -> List[Dict]:
+        return self._all(
+            "recommendations",
+            "SELECT * FROM recommendations WHERE stock_id = ? ORDER BY recommendation_date DESC LIMIT ?",
+            (stock_id, limit)
+        )
+
+    def get_watched_stocks(self) -> List[Dict]:
+        return self._all(
+            "stocks",
+            "SELECT DISTINCT s.ticker, s.country FROM user_watchlist w JOIN stocks s ON s.id = w.stock_id",
+            ()
+        )
+
+    def get_analysis_snapshot(self, ticker: str, model_type: str, prediction_days: int, forecast_mode: str) -> Optional[Dict]:
+        return self._one(
+            "analysis_snapshots",
+            "SELECT session_date, payload FROM analysis_snapshots "
+            "WHERE ticker = ? AND model_type = ? AND prediction_days = ? AND forecast_mode = ?",
+            (ticker, model_type, prediction_days, forecast_mode)
+        )
+
+    def insert(self, table: str, records: List[Dict]) -> List[Dict]:
+        rows = [self._encode(table, {"id": str(uuid.uuid4()), **record}) for record in records]
+
+        with self._lock, self._conn:
+            for columns, group in self._by_columns(rows).items():
+                self._conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(row[c] for c in columns) for row in group]
+                )
+
+            ids = [row["id"] for row in rows]
+            inserted = self._conn.execute(
+                f"SELECT * FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall() if ids else []
+
+        return [self._decode(table, row) for row in inserted]
+
+    def upsert(self, table: str, records: List[Dict], on_conflict: str) -> None:
+        keys = [key.strip() for key in on_conflict.split(",")]
+        rows = [self._encode(table, {"id": str(uuid.uuid4()), **record}) for record in records]
+
+        with self._lock, self._conn:
+            for columns, group in self._by_columns(rows).items():
+                # The existing row keeps its id, everything else is overwritten
+                updates = [c for c in columns if c not in keys and c != "id"]
+                conflict = f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updates)}" if updates else "DO NOTHING"
+                self._conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT ({', '.join(keys)}) {conflict}",
+                    [tuple(row[c] for c in columns) for row in group]
+                )
+
+    def _by_columns(self, rows: List[Dict]) -> Dict[tuple, List[Dict]]:
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+        return groups
+
+    def _one(self, table: str, sql: str, params: tuple) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        if row is None or all(value is None for value in tuple(row)):
+            return None
+        return self._decode(table, row)
+
+    def _all(self, table: str, sql: str, params: tuple) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._decode(table, row) for row in rows]
+
+    def _encode(self, table: str, record: Dict) -> Dict:
+        for column in JSON_COLUMNS.get(table, ()):
+            if record.get(column) is not None:
+                record[column] = json.dumps(record[column], default=str)
+        return record
+
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        for column in JSON_COLUMNS.get(table, ()):
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+        return record
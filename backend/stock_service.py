@@ -1,19 +1,33 @@
-import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Tuple
-from database import get_supabase_client
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from database import get_repository
+from repository import StorageRepository
+from write_behind import persist
+from market_data_cache import get_market_data_cache
+from price_store import get_price_store
+from search_index import get_search_index
+from screener import get_screener
+from instrumentation import timed
+from config import settings
 import uuid
 
 class StockDataService:
     def __init__(self):
-        self.supabase = get_supabase_client()
+        self.market_data = get_market_data_cache()
+        self.price_store = get_price_store()
+        self.search_index = get_search_index()
+        self.screener = get_screener()
+
+    # Resolved on use, the offline backtester builds this service without storage
+    @property
+    def repository(self) -> StorageRepository:
+        return get_repository()
 
     def fetch_stock_data(self, ticker: str, period: str = "1y") -> Tuple[Optional[Dict], pd.DataFrame]:
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            hist = stock.history(period=period)
+            info = self.market_data.get_info(ticker)
+            hist = self.market_data.get_history(ticker, period=period)
 
             if hist.empty:
                 return None, pd.DataFrame()
@@ -33,87 +47,169 @@ class StockDataService:
             print(f"Error fetching data for {ticker}: {str(e)}")
             return None, pd.DataFrame()
 
+    @timed("resolve_stock")
     def get_or_create_stock(self, ticker: str) -> Optional[Dict]:
         ticker = ticker.upper()
 
-        existing = self.supabase.table("stocks").select("*").eq("ticker", ticker).maybeSingle().execute()
+        existing = self.repository.get_stock_by_ticker(ticker)
 
-        if existing.data:
-            return existing.data
+        if existing:
+            return existing
 
-        stock_info, hist = self.fetch_stock_data(ticker)
+        # Same window as the full price backfill so the cached download is reused
+        stock_info, hist = self.fetch_stock_data(ticker, period="2y")
         if not stock_info:
             return None
 
-        result = self.supabase.table("stocks").insert(stock_info).execute()
-        return result.data[0] if result.data else None
+        inserted = self.repository.insert("stocks", [stock_info])
+        if not inserted:
+            return None
+
+        self.search_index.add(inserted[0])
+        self.screener.add_stock(inserted[0])
+        return inserted[0]
 
-    def save_stock_prices(self, stock_id: str, hist_data: pd.DataFrame) -> bool:
+    def fetch_price_history(self, ticker: str, period: str = "2y", start: Optional[str] = None) -> pd.DataFrame:
         try:
-            hist_data = hist_data.reset_index()
-
-            for _, row in hist_data.iterrows():
-                price_data = {
-                    "stock_id": stock_id,
-                    "date": row["Date"].strftime("%Y-%m-%d"),
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"]),
-                    "adjusted_close": float(row["Close"])
-                }
+            return self.market_data.get_history(ticker, period=period, start=start)
+        except Exception as e:
+            print(f"Error fetching price history for {ticker}: {str(e)}")
+            return pd.DataFrame()
+
+    def fetch_price_histories(self, tickers: List[str], period: str = "2y") -> Dict[str, pd.DataFrame]:
+        try:
+            return self.market_data.get_histories(tickers, period=period)
+        except Exception as e:
+            print(f"Error fetching price histories: {str(e)}")
+            return {}
 
-                self.supabase.table("stock_prices").upsert(
-                    price_data,
-                    on_conflict="stock_id,date"
-                ).execute()
+    def get_latest_price_date(self, stock_id: str) -> Optional[date]:
+        latest = self.repository.get_latest_price_date(stock_id)
+        return date.fromisoformat(latest) if latest else None
 
-            return True
+    @timed("sync_prices")
+    def sync_stock_prices(self, stock_id: str, ticker: str, full_period: str = "2y", full_backfill: bool = False, history: Optional[pd.DataFrame] = None) -> Dict:
+        last_date = None if full_backfill else self.get_latest_price_date(stock_id)
+
+        if history is not None:
+            # Already downloaded by the caller, only the rows past the stored ones are written
+            hist = history[history.index.date >= last_date] if last_date and not history.empty else history
+        elif last_date:
+            # Re-fetch the last stored bar as well, it may have been saved intraday
+            hist = self.fetch_price_history(ticker, start=last_date.strftime("%Y-%m-%d"))
+            if not hist.empty:
+                hist = hist[hist.index.date >= last_date]
+        else:
+            hist = self.fetch_price_history(ticker, period=full_period)
+
+        records = self.build_price_records(stock_id, hist) if not hist.empty else []
+        report = self.save_price_records(records)
+
+        report["records"] = records
+        report["mode"] = "incremental" if last_date else "full"
+        report["last_stored_date"] = last_date.isoformat() if last_date else None
+        report["rows_fetched"] = len(hist)
+        return report
+
+    def save_stock_prices(self, stock_id: str, hist_data: pd.DataFrame, chunk_size: Optional[int] = None) -> Dict:
+        try:
+            records = self.build_price_records(stock_id, hist_data)
         except Exception as e:
-            print(f"Error saving stock prices: {str(e)}")
-            return False
+            print(f"Error preparing stock prices: {str(e)}")
+            return {"written": 0, "failed": len(hist_data), "chunks": []}
+
+        return self.save_price_records(records, chunk_size=chunk_size)
+
+    @timed("save_prices")
+    def save_price_records(self, records: List[Dict], chunk_size: Optional[int] = None) -> Dict:
+        report = persist("stock_prices", records, on_conflict="stock_id,date", chunk_size=chunk_size)
+        if report["failed"]:
+            print(f"Saved {report['written']} stock prices, {report['failed']} failed")
+
+        return report
+
+    def build_price_records(self, stock_id: str, hist_data: pd.DataFrame) -> List[Dict]:
+        hist_data = hist_data.reset_index()
+        close = hist_data["Close"].astype(float)
+
+        records = pd.DataFrame({
+            "stock_id": stock_id,
+            "date": pd.to_datetime(hist_data["Date"]).dt.strftime("%Y-%m-%d"),
+            "open": hist_data["Open"].astype(float),
+            "high": hist_data["High"].astype(float),
+            "low": hist_data["Low"].astype(float),
+            "close": close,
+            "volume": hist_data["Volume"].astype("int64"),
+            "adjusted_close": close
+        })
+
+        return records.to_dict("records")
 
     def get_historical_prices(self, stock_id: str, days: int = 365) -> list:
         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
 
-        result = self.supabase.table("stock_prices")\
-            .select("*")\
-            .eq("stock_id", stock_id)\
-            .gte("date", start_date)\
-            .order("date", desc=False)\
-            .execute()
+        return self.repository.get_prices(stock_id, start_date)
 
-        return result.data if result.data else []
+    @timed("load_prices")
+    def get_price_frame(self, stock_id: str, ticker: str, records: List[Dict], days: int = 365) -> pd.DataFrame:
+        self.update_price_store(stock_id, ticker, records, days=days)
 
-    def get_latest_price(self, stock_id: str) -> Optional[Dict]:
-        result = self.supabase.table("stock_prices")\
-            .select("*")\
-            .eq("stock_id", stock_id)\
-            .order("date", desc=True)\
-            .limit(1)\
-            .maybeSingle()\
-            .execute()
+        start_date = (datetime.now() - timedelta(days=days)).date()
+        return self.price_store.frame(ticker, start=start_date)
 
-        return result.data
+    def update_price_store(self, stock_id: str, ticker: str, records: List[Dict], days: int = 365):
+        # The database is read to seed the local store, and again only when
+        # it has bars the store lacks: rows written by the batch path or by a
+        # worker with its own store. Otherwise the synced rows are appended.
+        last_stored = self.price_store.last_date(ticker)
+        if last_stored is None:
+            self.price_store.append(ticker, self.get_historical_prices(stock_id, days=days))
+        else:
+            first_new = min(record["date"] for record in records) if records else None
+            if first_new is None:
+                latest = self.get_latest_price_date(stock_id)
+                behind = latest is not None and latest > last_stored
+            else:
+                behind = first_new > last_stored.isoformat()
+            if behind:
+                self.price_store.append(ticker, self.repository.get_prices(stock_id, last_stored.isoformat()))
+        self.price_store.append(ticker, records)
 
-    def get_financial_statements(self, ticker: str) -> Dict[str, Any]:
+    def price_rows(self, stock_id: str, prices_df: pd.DataFrame) -> List[Dict]:
+        rows = prices_df[["date", "open", "high", "low", "close", "volume", "adjusted_close"]].copy()
+        rows["date"] = pd.to_datetime(rows["date"]).dt.strftime("%Y-%m-%d")
+        rows.insert(0, "stock_id", stock_id)
+        return rows.to_dict("records")
+
+    def get_latest_price(self, stock_id: str) -> Optional[Dict]:
+        return self.repository.get_latest_price(stock_id)
+
+    @timed("financial_statements")
+    def get_financial_statements(self, ticker: str, stock_id: Optional[str] = None) -> Dict[str, Any]:
         try:
-            stock = yf.Ticker(ticker)
+            statements = self.get_stored_statements(stock_id) if stock_id else {}
+
+            if not statements or self._statements_due(statements):
+                fetched = self._fetch_statements(ticker)
+                if stock_id and self._newest_period_end(fetched) > self._newest_period_end(statements):
+                    self.save_financial_statements(stock_id, fetched)
+                statements = fetched or statements
+
+            info = self.market_data.get_info(ticker)
 
             financial_data = {
-                "income_statement": stock.income_stmt.to_dict() if hasattr(stock, 'income_stmt') else {},
-                "balance_sheet": stock.balance_sheet.to_dict() if hasattr(stock, 'balance_sheet') else {},
-                "cash_flow": stock.cashflow.to_dict() if hasattr(stock, 'cashflow') else {},
+                "income_statement": statements.get("income_statement", {}),
+                "balance_sheet": statements.get("balance_sheet", {}),
+                "cash_flow": statements.get("cash_flow", {}),
                 "info": {
-                    "marketCap": stock.info.get("marketCap"),
-                    "trailingPE": stock.info.get("trailingPE"),
-                    "forwardPE": stock.info.get("forwardPE"),
-                    "priceToBook": stock.info.get("priceToBook"),
-                    "debtToEquity": stock.info.get("debtToEquity"),
-                    "returnOnEquity": stock.info.get("returnOnEquity"),
-                    "revenueGrowth": stock.info.get("revenueGrowth"),
-                    "earningsGrowth": stock.info.get("earningsGrowth")
+                    "marketCap": info.get("marketCap"),
+                    "trailingPE": info.get("trailingPE"),
+                    "forwardPE": info.get("forwardPE"),
+                    "priceToBook": info.get("priceToBook"),
+                    "debtToEquity": info.get("debtToEquity"),
+                    "returnOnEquity": info.get("returnOnEquity"),
+                    "revenueGrowth": info.get("revenueGrowth"),
+                    "earningsGrowth": info.get("earningsGrowth")
                 }
             }
 
@@ -121,3 +217,47 @@ class StockDataService:
         except Exception as e:
             print(f"Error fetching financial statements: {str(e)}")
             return {}
+
+    def get_stored_statements(self, stock_id: str) -> Dict[str, Dict]:
+        statements = {}
+        for row in self.repository.get_financial_statements(stock_id):
+            statements.setdefault(row["statement_type"], {})[row["period_end"]] = row["data"]
+        return statements
+
+    def save_financial_statements(self, stock_id: str, statements: Dict[str, Dict]) -> Dict:
+        records = [
+            {
+                "stock_id": stock_id,
+                "period_end": period_end,
+                "statement_type": statement_type,
+                "data": data
+            }
+            for statement_type, periods in statements.items()
+            for period_end, data in periods.items()
+        ]
+
+        return persist("financial_statements", records, on_conflict="stock_id,period_end,statement_type")
+
+    def _fetch_statements(self, ticker: str) -> Dict[str, Dict]:
+        statements = {}
+        for statement_type, frame in self.market_data.get_statements(ticker).items():
+            if frame is None or frame.empty:
+                continue
+
+            statements[statement_type] = {
+                pd.Timestamp(period_end).strftime("%Y-%m-%d"): self._to_json_values(frame[period_end])
+                for period_end in frame.columns
+            }
+        return statements
+
+    def _to_json_values(self, values: pd.Series) -> Dict:
+        return values.astype(object).where(values.notna(), None).to_dict()
+
+    def _newest_period_end(self, statements: Dict[str, Dict]) -> str:
+        return max((period_end for periods in statements.values() for period_end in periods), default="")
+
+    def _statements_due(self, statements: Dict[str, Dict]) -> bool:
+        # A new period is only published once it has ended and the filing lag has passed
+        newest = pd.Timestamp(self._newest_period_end(statements))
+        next_filing = newest + pd.DateOffset(months=settings.STATEMENT_PERIOD_MONTHS) + pd.Timedelta(days=settings.STATEMENT_FILING_LAG_DAYS)
+        return pd.Timestamp.now() >= next_filing
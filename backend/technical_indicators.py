@@ -1,81 +1,186 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List
-from database import get_supabase_client
-from ta.momentum import RSIIndicator
-from ta.trend import MACD, SMAIndicator, EMAIndicator
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config import settings
+from database import get_repository
+from repository import StorageRepository
+from write_behind import persist
+from indicator_engine import IndicatorEngine, INDICATOR_COLUMNS
+from instrumentation import timed
+from screener import get_screener
 
 class TechnicalIndicatorsService:
     def __init__(self):
-        self.supabase = get_supabase_client()
+        self.engine = IndicatorEngine()
+        self.screener = get_screener()
+        # Incremental state and last saved date per stock, least recently
+        # used dropped first. A dropped date is read back from the table
+        self._states: "OrderedDict[str, Dict]" = OrderedDict()
+        self._saved_through: "OrderedDict[str, str]" = OrderedDict()
+        self._states_lock = threading.Lock()
 
-    def calculate_indicators(self, prices_df: pd.DataFrame) -> pd.DataFrame:
-        if prices_df.empty or len(prices_df) < 200:
-            return pd.DataFrame()
+    # Resolved on use, the offline backtester builds this service without storage
+    @property
+    def repository(self) -> StorageRepository:
+        return get_repository()
 
-        df = prices_df.copy()
-        df = df.sort_values('date')
+    @timed("indicators")
+    def calculate_indicators(self, prices_df: pd.DataFrame, stock_id: Optional[str] = None) -> pd.DataFrame:
+        if prices_df.empty:
+            return pd.DataFrame()
 
-        close_prices = df['close']
+        # Indicator columns are added to a shallow copy, the price columns stay shared
+        if prices_df['date'].is_monotonic_increasing:
+            df = prices_df.copy(deep=False)
+        else:
+            df = prices_df.sort_values('date')
+        df = df.reset_index(drop=True)
 
-        rsi = RSIIndicator(close=close_prices, window=14)
-        df['rsi_14'] = rsi.rsi()
+        close_prices = df['close'].to_numpy(dtype=np.float64)
 
-        macd_indicator = MACD(
-            close=close_prices,
-            window_slow=26,
-            window_fast=12,
-            window_sign=9
-        )
-        df['macd'] = macd_indicator.macd()
-        df['macd_signal'] = macd_indicator.macd_signal()
-        df['macd_histogram'] = macd_indicator.macd_diff()
+        cached = self._cached_state(stock_id) if stock_id else None
+        new_rows = self._rows_after_cached(df, close_prices, cached) if cached else None
 
-        df['sma_20'] = SMAIndicator(close=close_prices, window=20).sma_indicator()
-        df['sma_50'] = SMAIndicator(close=close_prices, window=50).sma_indicator()
-        df['sma_200'] = SMAIndicator(close=close_prices, window=200).sma_indicator()
+        if new_rows is not None:
+            # Only the bars after the cached state need computing
+            df = df.merge(cached["indicators"], on='date', how='left')
+            state = copy.deepcopy(cached["state"])
+            for i in new_rows:
+                values = self.engine.update(state, close_prices[i])
+                for column in INDICATOR_COLUMNS:
+                    df.at[i, column] = values[column][0]
+        else:
+            indicators, state = self.engine.compute(close_prices)
+            for column in INDICATOR_COLUMNS:
+                df[column] = indicators[column]
 
-        df['ema_12'] = EMAIndicator(close=close_prices, window=12).ema_indicator()
-        df['ema_26'] = EMAIndicator(close=close_prices, window=26).ema_indicator()
+        if stock_id:
+            self._remember_state(stock_id, {
+                "state": state,
+                "last_date": df['date'].iloc[-1],
+                "last_close": close_prices[-1],
+                "indicators": df[['date'] + INDICATOR_COLUMNS]
+            })
 
         return df
 
-    def save_indicators(self, stock_id: str, indicators_df: pd.DataFrame) -> bool:
+    def _cached_state(self, stock_id: str) -> Optional[Dict]:
+        with self._states_lock:
+            return _lru_get(self._states, stock_id)
+
+    def _remember_state(self, stock_id: str, entry: Dict):
+        with self._states_lock:
+            _lru_put(self._states, stock_id, entry)
+
+    @timed("indicators_batch")
+    def calculate_indicators_batch(self, price_frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        # Frames sharing the same trading dates go through the engine as one 2-D array
+        frames = {
+            key: df.sort_values('date').reset_index(drop=True)
+            for key, df in price_frames.items() if not df.empty
+        }
+        groups: Dict[tuple, List[str]] = {}
+        for key, df in frames.items():
+            groups.setdefault(tuple(df['date']), []).append(key)
+
+        results = {}
+        for keys in groups.values():
+            closes = np.column_stack([frames[key]['close'].astype(float).to_numpy() for key in keys])
+            indicators, _ = self.engine.compute(closes)
+
+            for j, key in enumerate(keys):
+                df = frames[key].copy()
+                for column in INDICATOR_COLUMNS:
+                    df[column] = indicators[column][:, j]
+                results[key] = df
+
+        return results
+
+    def _rows_after_cached(self, df: pd.DataFrame, close_prices: np.ndarray, cached: Dict) -> Optional[List[int]]:
+        matches = np.flatnonzero((df['date'] == cached["last_date"]).to_numpy())
+        if len(matches) == 0:
+            return None
+
+        # A revised last bar invalidates the rolling state
+        last = matches[0]
+        if close_prices[last] != cached["last_close"]:
+            return None
+
+        cached_dates = set(cached["indicators"]['date'])
+        if not df['date'].iloc[:last + 1].isin(cached_dates).all():
+            return None
+
+        return list(range(last + 1, len(df)))
+
+    @timed("save_indicators")
+    def save_indicators(self, stock_id: str, indicators_df: pd.DataFrame) -> Dict:
         try:
-            for _, row in indicators_df.iterrows():
-                indicator_data = {
-                    "stock_id": stock_id,
-                    "date": row["date"].strftime("%Y-%m-%d") if hasattr(row["date"], 'strftime') else str(row["date"]),
-                    "rsi_14": float(row["rsi_14"]) if pd.notna(row.get("rsi_14")) else None,
-                    "macd": float(row["macd"]) if pd.notna(row.get("macd")) else None,
-                    "macd_signal": float(row["macd_signal"]) if pd.notna(row.get("macd_signal")) else None,
-                    "macd_histogram": float(row["macd_histogram"]) if pd.notna(row.get("macd_histogram")) else None,
-                    "sma_20": float(row["sma_20"]) if pd.notna(row.get("sma_20")) else None,
-                    "sma_50": float(row["sma_50"]) if pd.notna(row.get("sma_50")) else None,
-                    "sma_200": float(row["sma_200"]) if pd.notna(row.get("sma_200")) else None,
-                    "ema_12": float(row["ema_12"]) if pd.notna(row.get("ema_12")) else None,
-                    "ema_26": float(row["ema_26"]) if pd.notna(row.get("ema_26")) else None
-                }
-
-                self.supabase.table("technical_indicators").upsert(
-                    indicator_data,
-                    on_conflict="stock_id,date"
-                ).execute()
-
-            return True
+            latest = self.build_latest_indicators(stock_id, indicators_df)
+            with self._states_lock:
+                last_saved = _lru_get(self._saved_through, stock_id)
+            last_saved = last_saved or self.get_latest_indicator_date(stock_id)
+            dates = pd.to_datetime(indicators_df["date"])
+
+            # The last stored date is rewritten too, its bar may have been revised since
+            if last_saved:
+                indicators_df = indicators_df[dates >= pd.Timestamp(last_saved)]
+
+            records = self.build_indicator_records(stock_id, indicators_df)
         except Exception as e:
-            print(f"Error saving indicators: {str(e)}")
-            return False
+            print(f"Error preparing indicators: {str(e)}")
+            return {"written": 0, "failed": len(indicators_df), "chunks": []}
 
-    def get_latest_indicators(self, stock_id: str, limit: int = 30) -> List[Dict]:
-        result = self.supabase.table("technical_indicators")\
-            .select("*")\
-            .eq("stock_id", stock_id)\
-            .order("date", desc=True)\
-            .limit(limit)\
-            .execute()
+        # The marker only moves once the rows are stored: if the write-behind
+        # thread gives up on them, the next save sends them again
+        saved_through = records[-1]["date"] if records else None
+        report = persist(
+            "technical_indicators", records, on_conflict="stock_id,date",
+            on_written=lambda: self._mark_saved(stock_id, saved_through)
+        )
+        if report["failed"]:
+            print(f"Saved {report['written']} indicator rows, {report['failed']} failed")
+            return report
+
+        if latest:
+            self.screener.update_indicators(latest)
+
+        return report
 
-        return result.data if result.data else []
+    def _mark_saved(self, stock_id: str, saved_through: Optional[str]):
+        # Runs on the write-behind thread while requests read the markers
+        with self._states_lock:
+            if saved_through and saved_through > (self._saved_through.get(stock_id) or ""):
+                _lru_put(self._saved_through, stock_id, saved_through)
+
+    def build_latest_indicators(self, stock_id: str, indicators_df: pd.DataFrame) -> Optional[Dict]:
+        # Same shape as a latest_technical_indicators row, for the screener
+        if indicators_df.empty:
+            return None
+
+        last_two = self.build_indicator_records(stock_id, indicators_df.tail(2))
+        latest = last_two[-1]
+        latest["close"] = float(indicators_df["close"].iloc[-1]) if "close" in indicators_df else None
+        latest["previous_macd"] = last_two[0]["macd"] if len(last_two) > 1 else None
+        latest["previous_macd_signal"] = last_two[0]["macd_signal"] if len(last_two) > 1 else None
+        return latest
+
+    def get_latest_indicator_date(self, stock_id: str) -> Optional[str]:
+        return self.repository.get_latest_indicator_date(stock_id)
+
+    def build_indicator_records(self, stock_id: str, indicators_df: pd.DataFrame) -> List[Dict]:
+        values = indicators_df[INDICATOR_COLUMNS].astype(float)
+
+        records = values.astype(object).where(values.notna(), None)
+        records.insert(0, "date", pd.to_datetime(indicators_df["date"]).dt.strftime("%Y-%m-%d"))
+        records.insert(0, "stock_id", stock_id)
+
+        return records.to_dict("records")
+
+    def get_latest_indicators(self, stock_id: str, limit: int = 30) -> List[Dict]:
+        return self.repository.get_indicators(stock_id, limit)
 
     def analyze_technical_signals(self, indicators: Dict) -> Dict[str, any]:
         score = 0.5
@@ -102,7 +207,7 @@ class TechnicalIndicatorsService:
                 signals.append("MACD is below signal line (bearish)")
                 score -= 0.1
 
-        if all(k in indicators for k in ["close", "sma_50", "sma_200"]):
+        if all(indicators.get(k) is not None for k in ["close", "sma_50", "sma_200"]):
             close = indicators["close"]
             sma_50 = indicators["sma_50"]
             sma_200 = indicators["sma_200"]
@@ -127,3 +232,50 @@ class TechnicalIndicatorsService:
             "signals": signals,
             "sentiment": "bullish" if score > 0.6 else "bearish" if score < 0.4 else "neutral"
         }
+
+    def analyze_technical_signals_batch(self, indicators: pd.DataFrame) -> pd.DataFrame:
+        # analyze_technical_signals for one row per stock, without the signal
+        # text; NaN stands in for a missing value, and zero RSI/MACD values
+        # are skipped like the falsy checks there
+        rsi = indicators["rsi_14"].to_numpy(dtype=np.float64)
+        macd = indicators["macd"].to_numpy(dtype=np.float64)
+        macd_signal = indicators["macd_signal"].to_numpy(dtype=np.float64)
+        close = indicators["close"].to_numpy(dtype=np.float64)
+        sma_50 = indicators["sma_50"].to_numpy(dtype=np.float64)
+        sma_200 = indicators["sma_200"].to_numpy(dtype=np.float64)
+
+        score = np.full(len(indicators), 0.5)
+
+        has_rsi = ~np.isnan(rsi) & (rsi != 0)
+        score += np.where(has_rsi & (rsi < 30), 0.15, 0.0)
+        score -= np.where(has_rsi & (rsi > 70), 0.15, 0.0)
+
+        has_macd = ~np.isnan(macd) & (macd != 0) & ~np.isnan(macd_signal) & (macd_signal != 0)
+        score += np.where(has_macd, np.where(macd > macd_signal, 0.1, -0.1), 0.0)
+
+        has_sma = ~np.isnan(close) & ~np.isnan(sma_50) & ~np.isnan(sma_200)
+        trend = np.select(
+            [(close > sma_50) & (sma_50 > sma_200), (close < sma_50) & (sma_50 < sma_200), close > sma_50],
+            [0.15, -0.15, 0.05],
+            -0.05
+        )
+        score += np.where(has_sma, trend, 0.0)
+
+        score = np.clip(score, 0.0, 1.0)
+
+        return pd.DataFrame({
+            "score": score,
+            "sentiment": np.select([score > 0.6, score < 0.4], ["bullish", "bearish"], "neutral")
+        }, index=indicators.index)
+
+def _lru_get(entries: OrderedDict, key: str):
+    value = entries.get(key)
+    if value is not None:
+        entries.move_to_end(key)
+    return value
+
+def _lru_put(entries: OrderedDict, key: str, value):
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > settings.INDICATOR_STATE_MAX_ENTRIES:
+        entries.popitem(last=False)
@@ -0,0 +1,21 @@
+import re
+from pathlib import Path
+
+# Letters, digits and the punctuation exchanges use (BRK-B, BBCA.JK, ^GSPC,
+# EURUSD=X). No slashes and no leading dot, so a ticker is always a single
+# path component when the caches and stores use it as a directory name.
+TICKER_PATTERN = r"^[A-Za-z0-9^][A-Za-z0-9.\-^=]{0,19}$"
+
+_ticker_re = re.compile(TICKER_PATTERN)
+
+def normalize_ticker(ticker: str) -> str:
+    if not isinstance(ticker, str) or not _ticker_re.match(ticker):
+        raise ValueError(f"Invalid ticker: {ticker!r}")
+    return ticker.upper()
+
+def ticker_path(root: Path, ticker: str) -> Path:
+    path = root / normalize_ticker(ticker)
+    # Belt and braces on top of the pattern, the result must stay inside root
+    if not path.resolve().is_relative_to(root.resolve()):
+        raise ValueError(f"Invalid ticker: {ticker!r}")
+    return path
@@ -0,0 +1,236 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from config import settings
+from database import get_repository, upsert_in_chunks
+
+class WriteBehindQueue:
+    def __init__(self, max_size: Optional[int] = None):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size or settings.WRITE_QUEUE_MAX_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._inflight_since: Optional[float] = None
+        # Groups whose write failed, waiting for their next attempt. Only the
+        # flusher thread touches them; stats() reads _retrying_since
+        self._retries: Dict[Tuple[str, Optional[str]], Dict] = {}
+        self._retrying_since: Optional[float] = None
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "enqueued_rows": 0,
+            "written_rows": 0,
+            "failed_rows": 0,
+            "overflow_rows": 0,
+            "retries": 0,
+            "flushes": 0,
+            "last_flush_at": None,
+            "last_flush_lag_seconds": None
+        }
+
+    def enqueue(self, table: str, records: List[Dict], on_conflict: Optional[str] = None, on_written: Optional[Callable[[], None]] = None) -> Dict:
+        if not records:
+            return {"written": 0, "failed": 0, "queued": 0, "chunks": []}
+
+        self._ensure_started()
+        item = (table, on_conflict, records, time.time(), on_written)
+
+        try:
+            self._queue.put(item, timeout=settings.WRITE_QUEUE_PUT_TIMEOUT)
+        except queue.Full:
+            # Backpressure: write inline rather than drop data
+            self._count("overflow_rows", len(records))
+            return _write_and_confirm(table, records, on_conflict, on_written)
+
+        self._count("enqueued_rows", len(records))
+        return {"written": 0, "failed": 0, "queued": len(records), "chunks": []}
+
+    def flush(self):
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self.flush()
+        self._stopping.set()
+        self._thread.join(timeout=settings.WRITE_FLUSH_INTERVAL * 4)
+
+    def stats(self) -> Dict:
+        with self._queue.mutex:
+            oldest = self._queue.queue[0][3] if self._queue.queue else None
+        waiting = [since for since in (oldest, self._inflight_since, self._retrying_since) if since is not None]
+        oldest = min(waiting) if waiting else None
+
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+
+        return {
+            **metrics,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "lag_seconds": time.time() - oldest if oldest else 0.0
+        }
+
+    def _count(self, name: str, value: int):
+        with self._metrics_lock:
+            self.metrics[name] += value
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=settings.WRITE_FLUSH_INTERVAL))
+            except queue.Empty:
+                pass
+
+            # Give a burst a moment to accumulate so it goes out as one write per table
+            deadline = time.time() + settings.WRITE_FLUSH_INTERVAL
+            while batch and len(batch) < settings.WRITE_MAX_BATCH_ITEMS:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+
+            now = time.time()
+            due = {group: retry for group, retry in self._retries.items() if retry["due"] <= now}
+            if not batch and not due:
+                continue
+            for group in due:
+                del self._retries[group]
+
+            self._inflight_since = min([item[3] for item in batch] + [retry["since"] for retry in due.values()])
+            try:
+                self._flush_batch(batch, due)
+            finally:
+                flushed_at = time.time()
+                with self._metrics_lock:
+                    self.metrics["flushes"] += 1
+                    self.metrics["last_flush_at"] = flushed_at
+                    self.metrics["last_flush_lag_seconds"] = flushed_at - self._inflight_since
+                self._retrying_since = min((retry["since"] for retry in self._retries.values()), default=None)
+                self._inflight_since = None
+
+    def _flush_batch(self, batch: List[Tuple], due: Dict[Tuple[str, Optional[str]], Dict]):
+        # A group whose retry is still waiting keeps new items back too, so
+        # they are not written before the older rows they may supersede
+        fresh = []
+        for item in batch:
+            waiting = self._retries.get((item[0], item[1]))
+            if waiting is None:
+                fresh.append(item)
+            else:
+                waiting["records"].extend(item[2])
+                waiting["callbacks"].append(item[4])
+                waiting["tasks"] += 1
+
+        # Rows being retried go first so newer upserts of the same key win
+        retried = [(table, on_conflict, retry["records"], retry["since"], None) for (table, on_conflict), retry in due.items()]
+        for group, records in self._coalesce(retried + fresh).items():
+            table, on_conflict = group
+            retry = due.get(group) or {"callbacks": [], "tasks": 0, "attempt": 0, "since": time.time()}
+            items = [item for item in fresh if (item[0], item[1]) == group]
+            callbacks = retry["callbacks"] + [item[4] for item in items]
+            tasks = retry["tasks"] + len(items)
+            retry["since"] = min([retry["since"]] + [item[3] for item in items])
+
+            failed = []
+            chunk_size = settings.UPSERT_CHUNK_SIZE
+            for start in range(0, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                try:
+                    _execute(table, chunk, on_conflict)
+                    self._count("written_rows", len(chunk))
+                except Exception as e:
+                    print(f"Error writing {len(chunk)} {table} rows: {str(e)}")
+                    failed.extend(chunk)
+
+            if failed and retry["attempt"] < settings.WRITE_MAX_RETRIES:
+                # Retried on a later flush instead of sleeping here, so one
+                # failing table does not hold up the writes to the others
+                self._count("retries", 1)
+                self._retries[group] = {
+                    "records": failed,
+                    "callbacks": callbacks,
+                    "tasks": tasks,
+                    "attempt": retry["attempt"] + 1,
+                    "due": time.time() + settings.WRITE_RETRY_BACKOFF * (2 ** retry["attempt"]),
+                    "since": retry["since"]
+                }
+                continue
+
+            # Coalescing mixes items within a table, so an item only counts as
+            # written when nothing for its table failed
+            if failed:
+                print(f"Giving up on {len(failed)} {table} rows after {retry['attempt'] + 1} attempts")
+                self._count("failed_rows", len(failed))
+            else:
+                for on_written in callbacks:
+                    if on_written is not None:
+                        _confirm(on_written)
+            for _ in range(tasks):
+                self._queue.task_done()
+
+    def _coalesce(self, batch: List[Tuple]) -> Dict[Tuple[str, Optional[str]], List[Dict]]:
+        grouped: Dict[Tuple[str, Optional[str]], "OrderedDict"] = {}
+
+        for table, on_conflict, records, _, _ in batch:
+            rows = grouped.setdefault((table, on_conflict), OrderedDict())
+            key_columns = on_conflict.split(",") if on_conflict else None
+            for record in records:
+                # Later upserts of the same key supersede earlier ones
+                key = tuple(record.get(c) for c in key_columns) if key_columns else id(record)
+                rows.pop(key, None)
+                rows[key] = record
+
+        return {group: list(rows.values()) for group, rows in grouped.items()}
+
+def _execute(table: str, records: List[Dict], on_conflict: Optional[str]):
+    if on_conflict:
+        get_repository().upsert(table, records, on_conflict=on_conflict)
+    else:
+        get_repository().insert(table, records)
+
+def write_now(table: str, records: List[Dict], on_conflict: Optional[str] = None, chunk_size: Optional[int] = None) -> Dict:
+    if on_conflict:
+        return upsert_in_chunks(table, records, on_conflict=on_conflict, chunk_size=chunk_size)
+
+    try:
+        _execute(table, records, None)
+        return {"written": len(records), "failed": 0, "chunks": []}
+    except Exception as e:
+        print(f"Error inserting {table} rows: {str(e)}")
+        return {"written": 0, "failed": len(records), "chunks": []}
+
+write_queue = WriteBehindQueue()
+
+def get_write_queue() -> WriteBehindQueue:
+    return write_queue
+
+def _confirm(on_written: Callable[[], None]):
+    try:
+        on_written()
+    except Exception as e:
+        print(f"Error in write confirmation callback: {str(e)}")
+
+def _write_and_confirm(table: str, records: List[Dict], on_conflict: Optional[str], on_written: Optional[Callable[[], None]], chunk_size: Optional[int] = None) -> Dict:
+    report = write_now(table, records, on_conflict, chunk_size=chunk_size)
+    if on_written is not None and not report["failed"]:
+        _confirm(on_written)
+    return report
+
+def persist(table: str, records: List[Dict], on_conflict: Optional[str] = None, chunk_size: Optional[int] = None, on_written: Optional[Callable[[], None]] = None) -> Dict:
+    # With write-behind the report only says the rows were queued; on_written
+    # is called once they are actually stored
+    if settings.WRITE_BEHIND_ENABLED:
+        return write_queue.enqueue(table, records, on_conflict, on_written)
+    return _write_and_confirm(table, records, on_conflict, on_written, chunk_size=chunk_size)
@@ -0,0 +1,16 @@
+/*
+  # Prediction runs
+
+  ## Changes
+
+  ### `predictions`
+  - `run_id` (uuid) - Shared by every row written by one forecast run, so a
+    whole forecast can be read back as a unit
+
+  ## Indexes
+  - `idx_predictions_stock_run` for fetching one run of a stock
+*/
+
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS run_id uuid;
+
+CREATE INDEX IF NOT EXISTS idx_predictions_stock_run ON predictions(stock_id, run_id);
@@ -0,0 +1,49 @@
+/*
+  # Analysis snapshots
+
+  ## New Tables
+
+  ### `analysis_snapshots`
+  Latest precomputed `/api/analyze` response per stock and request shape,
+  written by the precompute worker after each market close
+  - `id` (uuid, primary key)
+  - `stock_id` (uuid, foreign key)
+  - `ticker` (text) - Ticker symbol the snapshot is looked up by
+  - `model_type` (text) - lstm or xgboost
+  - `prediction_days` (integer) - Forecast horizon
+  - `forecast_mode` (text) - recursive or direct
+  - `session_date` (date) - Market session whose close the snapshot covers
+  - `payload` (jsonb) - Full analysis response
+  - `created_at` (timestamptz)
+  - `updated_at` (timestamptz)
+
+  ## Security
+  - RLS enabled, public read access like the other stock data
+
+  ## Indexes
+  - Unique (ticker, model_type, prediction_days, forecast_mode), one snapshot per request shape
+  - `idx_user_watchlist_stock` for collecting the distinct watched stocks
+*/
+
+CREATE TABLE IF NOT EXISTS analysis_snapshots (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  stock_id uuid NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+  ticker text NOT NULL,
+  model_type text NOT NULL,
+  prediction_days integer NOT NULL,
+  forecast_mode text NOT NULL DEFAULT 'recursive',
+  session_date date NOT NULL,
+  payload jsonb NOT NULL,
+  created_at timestamptz DEFAULT now(),
+  updated_at timestamptz DEFAULT now(),
+  UNIQUE(ticker, model_type, prediction_days, forecast_mode)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_watchlist_stock ON user_watchlist(stock_id);
+
+ALTER TABLE analysis_snapshots ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view analysis snapshots"
+  ON analysis_snapshots FOR SELECT
+  TO public
+  USING (true);
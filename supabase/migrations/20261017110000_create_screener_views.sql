@@ -0,0 +1,61 @@
+/*
+  # Screener views
+
+  ## New Views
+
+  ### `latest_technical_indicators`
+  Newest indicator row per stock, read by the API when it loads the
+  in-memory screener snapshot
+  - `stock_id` (uuid)
+  - `date` (date) - Date of the newest indicator row
+  - `rsi_14`, `macd`, `macd_signal`, `sma_50`, `sma_200` (decimal)
+  - `close` (decimal) - Close on the same date, for price vs moving average filters
+  - `previous_macd`, `previous_macd_signal` (decimal) - Row before it, for MACD crossovers
+
+  ### `latest_recommendations`
+  Newest recommendation per stock, all `recommendations` columns
+
+  ## Notes
+  - Each stock is resolved with LIMIT 1 lookups on the existing
+    (stock_id, date DESC) indexes, the history tables are not scanned
+  - security_invoker keeps the RLS policies of the underlying tables
+*/
+
+CREATE OR REPLACE VIEW latest_technical_indicators
+WITH (security_invoker = true) AS
+SELECT
+  s.id AS stock_id,
+  cur.date,
+  cur.rsi_14,
+  cur.macd,
+  cur.macd_signal,
+  cur.sma_50,
+  cur.sma_200,
+  price.close,
+  prev.macd AS previous_macd,
+  prev.macd_signal AS previous_macd_signal
+FROM stocks s
+JOIN LATERAL (
+  SELECT * FROM technical_indicators t
+  WHERE t.stock_id = s.id
+  ORDER BY t.date DESC
+  LIMIT 1
+) cur ON true
+LEFT JOIN LATERAL (
+  SELECT t.macd, t.macd_signal FROM technical_indicators t
+  WHERE t.stock_id = s.id AND t.date < cur.date
+  ORDER BY t.date DESC
+  LIMIT 1
+) prev ON true
+LEFT JOIN stock_prices price ON price.stock_id = s.id AND price.date = cur.date;
+
+CREATE OR REPLACE VIEW latest_recommendations
+WITH (security_invoker = true) AS
+SELECT r.*
+FROM stocks s
+JOIN LATERAL (
+  SELECT * FROM recommendations l
+  WHERE l.stock_id = s.id
+  ORDER BY l.recommendation_date DESC, l.created_at DESC
+  LIMIT 1
+) r ON true;